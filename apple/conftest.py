@@ -0,0 +1,19 @@
+import os
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+# main reads its signing key at import; sign test tokens with a throwaway one
+if not os.getenv("APPLE_PRIVATE_KEY"):
+    pem = (
+        ec.generate_private_key(ec.SECP256R1())
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode()
+    )
+    os.environ["APPLE_PRIVATE_KEY"] = "\n".join(pem.strip().splitlines()[1:-1])
+os.environ.setdefault("APPLE_TEAM_ID", "test_team_id")
+os.environ.setdefault("APPLE_KEY_ID", "test_key_id")
@@ -0,0 +1,200 @@
+"""
+Load test StoreTurn.find_artist for both clients against the local API stub.
+
+    python -m bench.bench_find_artist
+    python -m bench.bench_find_artist --latency 0.02 --rate-limit-every 50
+    python -m bench.bench_find_artist --client apple --browser
+    python -m bench.bench_find_artist --check    # fail if over bench/budget.json
+    python -m bench.bench_find_artist --update   # rewrite bench/budget.json
+
+Requests and bytes are deterministic for a given scenario, so --check compares
+them to the budget exactly (within BUDGET_TOLERANCE); wall time only has to
+stay under the budget's ceiling.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict
+from unittest.mock import patch
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+os.environ.setdefault("SPOTIFY_USER_ID", "bench")
+os.environ.pop("SPOTIFY_CACHE_BUCKET", None)
+os.environ.pop("SPOTIFY_CACHE_DIR", None)
+os.environ.pop("APPLE_CHART_BUCKET", None)
+os.environ.pop("APPLE_CHART_DIR", None)
+if not os.getenv("APPLE_PRIVATE_KEY"):
+    pem = (
+        ec.generate_private_key(ec.SECP256R1())
+        .private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        )
+        .decode()
+    )
+    os.environ["APPLE_PRIVATE_KEY"] = "\n".join(pem.strip().splitlines()[1:-1])
+os.environ.setdefault("APPLE_TEAM_ID", "bench")
+os.environ.setdefault("APPLE_KEY_ID", "bench")
+
+from apple import main as apple
+from spotify.package import main as spotify
+from bench.fake_driver import FakeDriver
+from bench.stub import BENCH_ARTIST, ApiStub
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "budget.json")
+BUDGET_TOLERANCE = 0.1
+SCENARIO = {
+    "latency": 0.005,
+    "rate_limit_every": 97,
+    "retry_after": 0.05,
+    "playlists": 60,
+    "tracks": 250,
+    "track_page_limit": 100,
+    "hit_every": 40,
+    "room_data": True,
+}
+
+
+def measure(find_artist: Callable[[], Dict]) -> Dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = find_artist()
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "wall": wall,
+        "peak_kib": peak / 1024,
+        "found": len(result.get(BENCH_ARTIST, [])),
+    }
+
+
+def bench_spotify(scenario: Dict) -> Dict:
+    with ApiStub(**scenario) as stub, patch.object(spotify, "send_email_aws"):
+        store_turn = spotify.StoreTurn(
+            {"artist": BENCH_ARTIST, "genres": {"s": ["bench1", "bench2"]}}
+        )
+        client = store_turn.spotify_client
+        client.token_url = stub.token_url
+        client.api_root = stub.api_root
+        client.token_manager.store = spotify.MemoryTokenStore()
+        metrics = measure(store_turn.find_artist)
+        metrics.update(stub.stats)
+    return metrics
+
+
+def bench_apple(scenario: Dict) -> Dict:
+    slept = []
+    driver = FakeDriver(
+        playlists=scenario["playlists"],
+        rows=scenario["tracks"],
+        hit_every=scenario["hit_every"],
+    )
+    with ApiStub(**scenario) as stub, patch.object(apple, "send_email_ses"), patch(
+        "apple.main.time.sleep", side_effect=slept.append
+    ):
+        store_turn = apple.StoreTurn(
+            {"artist": BENCH_ARTIST, "genres": {"am": ["993297962"]}}, driver
+        )
+        store_turn.apple_music_client.root = f"{stub.url}/v1/"
+        store_turn.apple_music_client.web_root = f"{stub.url}/"
+        metrics = measure(store_turn.find_artist)
+        metrics.update(stub.stats)
+    metrics["slept"] = sum(slept)
+    metrics["driver_calls"] = driver.calls
+    return metrics
+
+
+def report(results: Dict[str, Dict]) -> None:
+    print(
+        f"{'client':<8} {'wall':>7} {'reqs':>6} {'req/s':>7} {'KiB':>8} "
+        f"{'peak KiB':>9} {'429s':>5} {'found':>6} {'slept':>7}"
+    )
+    for name, m in results.items():
+        print(
+            f"{name:<8} {m['wall']:6.2f}s {m['requests']:6d} "
+            f"{m['requests'] / m['wall']:7.1f} {m['bytes'] / 1024:8.1f} "
+            f"{m['peak_kib']:9.1f} {m['rate_limited']:5d} {m['found']:6d} "
+            f"{m.get('slept', 0):6.1f}s"
+        )
+
+
+def check(results: Dict[str, Dict], budget: Dict[str, Dict]) -> bool:
+    ok = True
+    for name, m in results.items():
+        limits = budget[name]
+        for key in ("requests", "bytes"):
+            if m[key] > limits[key] * (1 + BUDGET_TOLERANCE):
+                print(f"{name}: {key} {m[key]} over budget {limits[key]}")
+                ok = False
+        if m["wall"] > limits["max_wall"]:
+            print(f"{name}: wall {m['wall']:.2f}s over {limits['max_wall']}s")
+            ok = False
+        if m["found"] != limits["found"]:
+            print(f"{name}: found {m['found']} tracks, expected {limits['found']}")
+            ok = False
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--latency", type=float, default=SCENARIO["latency"])
+    parser.add_argument(
+        "--rate-limit-every", type=int, default=SCENARIO["rate_limit_every"]
+    )
+    parser.add_argument("--retry-after", type=float, default=SCENARIO["retry_after"])
+    parser.add_argument("--playlists", type=int, default=SCENARIO["playlists"])
+    parser.add_argument("--tracks", type=int, default=SCENARIO["tracks"])
+    parser.add_argument(
+        "--track-page-limit", type=int, default=SCENARIO["track_page_limit"]
+    )
+    parser.add_argument("--hit-every", type=int, default=SCENARIO["hit_every"])
+    parser.add_argument(
+        "--browser",
+        dest="room_data",
+        action="store_false",
+        help="serve room pages without page data so Apple scrapes them",
+    )
+    parser.add_argument("--client", choices=["spotify", "apple"], action="append")
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--update", action="store_true")
+    args = parser.parse_args()
+
+    scenario = {key: getattr(args, key) for key in SCENARIO}
+    clients = {"spotify": bench_spotify, "apple": bench_apple}
+    results = {name: clients[name](scenario) for name in args.client or list(clients)}
+    report(results)
+
+    if args.update:
+        budget = {
+            name: {
+                "requests": m["requests"],
+                "bytes": m["bytes"],
+                "found": m["found"],
+                "max_wall": round(max(m["wall"] * 5, 5.0), 1),
+            }
+            for name, m in results.items()
+        }
+        with open(BUDGET_PATH, "w") as f:
+            json.dump(budget, f, indent=2)
+            f.write("\n")
+    if args.check:
+        with open(BUDGET_PATH) as f:
+            return 0 if check(results, json.load(f)) else 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Artist matching over a synthetic track corpus: the per-call lowering the
+clients used to do against the precompiled ArtistMatcher.
+
+    python -m bench.bench_matcher
+    python -m bench.bench_matcher --tracks 500000 --credits 50000 --roster 50
+"""
+
+import argparse
+import os
+import random
+import time
+from typing import Callable, Dict, List, Tuple
+
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+os.environ.setdefault("SPOTIFY_USER_ID", "bench")
+
+from spotify.package.main import ArtistMatcher
+
+ACCENTED = ["Beyoncé", "Rosalía", "Björk", "Måneskin", "Sigur Rós"]
+JOINERS = [" feat. ", " & ", ", ", " (ft. ", " featuring "]
+
+
+def make_corpus(
+    tracks: int, credits: int, names: List[str], seed: int = 7
+) -> List[Dict]:
+    """
+    Tracks shaped like projected Spotify items, drawn from a pool of credits
+    so they repeat across playlists the way real charts do, with the
+    multi-artist credit strings Apple returns in artistName
+    """
+    rng = random.Random(seed)
+    pool = []
+    for _ in range(credits):
+        artists = rng.sample(names, rng.choice((1, 1, 1, 2, 3)))
+        credit = artists[0]
+        for artist in artists[1:]:
+            joiner = rng.choice(JOINERS)
+            credit += joiner + artist + (")" if "(" in joiner else "")
+        pool.append((artists, credit))
+
+    corpus = []
+    for i in range(tracks):
+        artists, credit = rng.choice(pool)
+        corpus.append(
+            {
+                "track": {
+                    "name": f"Track {i}",
+                    "artists": [{"name": a} for a in artists],
+                    "album": {"artists": [{"name": artists[0]}]},
+                },
+                "artistName": credit,
+            }
+        )
+    return corpus
+
+
+def lowered(roster: List[str], corpus: List[Dict]) -> int:
+    """Spotify's album-artist comparison, lowering both sides per call"""
+    hits = 0
+    for item in corpus:
+        for artist_name in roster:
+            for artist in item["track"]["album"]["artists"]:
+                if artist["name"].lower() == artist_name.lower():
+                    hits += 1
+    return hits
+
+
+def substring(roster: List[str], corpus: List[Dict]) -> int:
+    """Apple's substring check on artistName"""
+    hits = 0
+    for item in corpus:
+        for artist_name in roster:
+            if artist_name.lower() in item["artistName"].lower():
+                hits += 1
+    return hits
+
+
+def matcher_spotify(roster: List[str], corpus: List[Dict]) -> int:
+    matcher = ArtistMatcher(roster)
+    hits = 0
+    for item in corpus:
+        track = item["track"]
+        credits = [a["name"] for a in track["artists"]]
+        credits += [a["name"] for a in track["album"]["artists"]]
+        hits += len(matcher.match(credits))
+    return hits
+
+
+def matcher_apple(roster: List[str], corpus: List[Dict]) -> int:
+    matcher = ArtistMatcher(roster)
+    return sum(len(matcher.match_credit(item["artistName"])) for item in corpus)
+
+
+def run(
+    fn: Callable[[List[str], List[Dict]], int], roster: List[str], corpus: List[Dict]
+) -> Tuple[float, int]:
+    start = time.perf_counter()
+    hits = fn(roster, corpus)
+    return time.perf_counter() - start, hits
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--tracks", type=int, default=200000)
+    parser.add_argument("--credits", type=int, default=20000)
+    parser.add_argument("--artists", type=int, default=5000)
+    parser.add_argument("--roster", type=int, default=25)
+    args = parser.parse_args()
+
+    names = ACCENTED + [f"Artist {i:05d}" for i in range(args.artists)]
+    corpus = make_corpus(args.tracks, args.credits, names)
+    roster = ACCENTED[:1] + names[len(ACCENTED) : len(ACCENTED) + args.roster - 1]
+
+    for label, old, new in (
+        ("spotify", lowered, matcher_spotify),
+        ("apple", substring, matcher_apple),
+    ):
+        old_secs, old_hits = run(old, roster, corpus)
+        new_secs, new_hits = run(new, roster, corpus)
+        print(
+            f"{label:<8} per-call {old_secs:6.2f}s ({old_hits} hits)  "
+            f"matcher {new_secs:6.2f}s ({new_hits} hits)  "
+            f"{old_secs / new_secs:5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""
+Bytes transferred and decode time per playlist with and without fields=.
+
+    python -m bench.bench_projection
+"""
+
+import os
+import statistics
+import time
+
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+os.environ.setdefault("SPOTIFY_USER_ID", "bench")
+
+from spotify.package.main import TRACK_FIELDS, TRACK_PAGE_SIZE, build_session
+from bench.stub import ApiStub
+
+
+def measure(session, endpoint: str, params, rounds: int):
+    sizes, decode = [], []
+    for _ in range(rounds):
+        r = session.get(endpoint, params=params)
+        sizes.append(len(r.content))
+        start = time.perf_counter()
+        r.json()
+        decode.append(time.perf_counter() - start)
+    return statistics.mean(sizes), statistics.mean(decode) * 1000
+
+
+def main(rounds: int = 50) -> None:
+    session = build_session()
+    with ApiStub(tracks=TRACK_PAGE_SIZE) as stub:
+        endpoint = f"{stub.api_root}/playlists/pl0/tracks"
+        results = {
+            "full": measure(session, endpoint, None, rounds),
+            "projected": measure(session, endpoint, {"fields": TRACK_FIELDS}, rounds),
+        }
+    for label, (size, decode_ms) in results.items():
+        print(f"{label:<10} {size / 1024:8.1f} KiB  r.json() {decode_ms:6.2f}ms")
+    full, projected = results["full"], results["projected"]
+    print(
+        f"saving     {full[0] / projected[0]:8.1f}x bytes  "
+        f"{full[1] / projected[1]:6.1f}x decode"
+    )
+
+
+if __name__ == "__main__":
+    main()
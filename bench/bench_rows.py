@@ -0,0 +1,113 @@
+"""
+Chart row extraction on saved HTML: one WebDriver round trip per field
+against the single execute_script read, with parsing the page data as the
+no-browser baseline.
+
+    python -m bench.bench_rows
+    python -m bench.bench_rows --dir bench/fixtures --repeat 20 --ipc 0.004
+
+Pages come from the recordings in bench/fixtures (see bench.replay), or the
+synthetic chart pages when nothing has been recorded. Both modes run the
+scrapers against ReplayDriver, which parses the HTML and evaluates the same
+locators the scrapers pass, including the XPaths handed to ALBUM_ROWS_JS.
+The JavaScript itself is never executed here, only the selectors it is given;
+the script needs a real Chrome pointed at bench.replay.ReplayServer.
+"""
+
+import argparse
+import time
+from typing import Callable, Dict, List, Tuple
+
+from bench.bench_find_artist import apple
+from bench.replay import FIXTURES, ReplayDriver, load_fixtures, synthetic_fixtures
+from bench.stub import BENCH_ARTIST
+
+
+def scrape(
+    driver: ReplayDriver, charts: Dict[str, str], repeat: int
+) -> Callable[[], int]:
+    client = apple.AppleMusicAPI(
+        apple.APPLE_PRIVATE_KEY,
+        apple.APPLE_KEY_ID,
+        apple.APPLE_TEAM_ID,
+        driver,
+        BENCH_ARTIST,
+    )
+
+    def run() -> int:
+        rows = 0
+        for _ in range(repeat):
+            for path, kind in charts.items():
+                url = client.web_root + path
+                driver.get(url)
+                if kind == "song":
+                    rows += len(client.scrape_songs(url, BENCH_ARTIST))
+                else:
+                    rows += len(client.scrape_albums(url))
+        return rows
+
+    return run
+
+
+def parse(
+    pages: Dict[str, str], charts: Dict[str, str], repeat: int
+) -> Callable[[], int]:
+    def run() -> int:
+        rows = 0
+        for _ in range(repeat):
+            for path, kind in charts.items():
+                items = apple.parse_room_items(pages[path])
+                rows += sum(1 for item in items if item["kind"] == kind)
+        return rows
+
+    return run
+
+
+def timed(fn: Callable[[], int]) -> Tuple[float, int]:
+    start = time.perf_counter()
+    rows = fn()
+    return time.perf_counter() - start, rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dir", default=FIXTURES)
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--ipc", type=float, default=0.002)
+    args = parser.parse_args()
+
+    pages, manifest = load_fixtures(args.dir)
+    if not manifest:
+        print(f"No recordings in {args.dir}, using synthetic pages")
+        pages, manifest = synthetic_fixtures(rows=args.rows)
+    charts = {
+        path: entry["kind"]
+        for path, entry in manifest.items()
+        if entry["kind"] in ("song", "album")
+    }
+
+    per_element = ReplayDriver(pages, ipc=args.ipc, bulk=False)
+    bulk = ReplayDriver(pages, ipc=args.ipc)
+    modes: List[Tuple[str, Callable[[], int], Callable[[], int]]] = [
+        (
+            "selectors",
+            scrape(per_element, charts, args.repeat),
+            lambda: per_element.calls,
+        ),
+        ("script", scrape(bulk, charts, args.repeat), lambda: bulk.calls),
+        ("page data", parse(pages, charts, args.repeat), lambda: 0),
+    ]
+
+    pages_read = len(charts) * args.repeat
+    print(f"{'mode':<10} {'secs':>7} {'rows':>7} {'rows/s':>10} {'calls/page':>11}")
+    for label, run, calls in modes:
+        secs, rows = timed(run)
+        print(
+            f"{label:<10} {secs:7.3f} {rows:7d} {rows / secs:10.0f} "
+            f"{calls() / pages_read:11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
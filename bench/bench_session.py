@@ -0,0 +1,57 @@
+"""
+Per-request latency of SpotifyAPI with and without a pooled session.
+
+    python -m bench.bench_session
+"""
+
+import os
+import statistics
+import time
+from typing import List
+
+os.environ.setdefault("SPOTIFY_CLIENT_ID", "bench")
+os.environ.setdefault("SPOTIFY_CLIENT_SECRET", "bench")
+os.environ.setdefault("SPOTIFY_USER_ID", "bench")
+
+from spotify.package.main import SpotifyAPI, TRACK_FIELDS
+from bench.stub import ApiStub
+
+
+def time_requests(api: SpotifyAPI, rounds: int) -> List[float]:
+    timings = []
+    api.get_access_token()
+    headers = {"Authorization": f"Bearer {api.access_token}"}
+    for _ in range(rounds):
+        start = time.perf_counter()
+        r = api._session.get(
+            f"{api.api_root}/playlists/pl0/tracks",
+            headers=headers,
+            params={"fields": TRACK_FIELDS},
+        )
+        r.json()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def report(label: str, timings: List[float]) -> None:
+    ms = sorted(t * 1000 for t in timings)
+    p95 = ms[int(len(ms) * 0.95) - 1]
+    print(
+        f"{label:<12} mean {statistics.mean(ms):6.2f}ms  "
+        f"p50 {statistics.median(ms):6.2f}ms  p95 {p95:6.2f}ms"
+    )
+
+
+def main(rounds: int = 200) -> None:
+    with ApiStub() as stub:
+        for label, requests_session in (("no session", False), ("pooled", True)):
+            api = SpotifyAPI(
+                "bench", "bench", "bench", requests_session=requests_session
+            )
+            api.token_url = stub.token_url
+            api.api_root = stub.api_root
+            report(label, time_requests(api, rounds))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,188 @@
+import time
+from typing import Dict, List
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+ALBUM_ROWS = '//*[@id="scrollable-page"]/main/div/div/div/ul/li'
+ALBUM_ARTIST = ".//div/div[2]/div/p/div/span/a"
+
+
+class FakeElement:
+    def __init__(
+        self,
+        driver: "FakeDriver",
+        text: str = "",
+        attributes: Dict[str, str] = None,
+        children=None,
+    ):
+        self.driver: "FakeDriver" = driver
+        self._text: str = text
+        self.attributes: Dict[str, str] = attributes or {}
+        self.children: Dict[str, "FakeElement"] = children or {}
+
+    @property
+    def text(self) -> str:
+        self.driver.call()
+        return self._text
+
+    def find_element(self, by, value) -> "FakeElement":
+        self.driver.call()
+        try:
+            return self.children[value]
+        except KeyError:
+            raise NoSuchElementException(value)
+
+    def get_attribute(self, name: str) -> str:
+        self.driver.call()
+        return self.attributes.get(name)
+
+
+class FakeSwitchTo:
+    def __init__(self, driver: "FakeDriver"):
+        self.driver = driver
+
+    def window(self, handle: str) -> None:
+        self.driver.call()
+        self.driver.current_window_handle = handle
+        self.driver.current_url = self.driver.tabs[handle]
+
+
+class FakeDriver:
+    """
+    WebDriver stand-in serving the room, song chart and album chart markup
+    the Apple scraper reads, so the scan path can run without Chrome
+
+    :param ipc: seconds each WebDriver command takes, element lookups and
+        .text reads included, as a chromedriver round trip would
+    :param bulk: answer the chart row scripts with the rows it was built
+        with, without evaluating them, False to force the scraper's
+        per-element fallback. bench.replay.ReplayDriver checks the scripts'
+        selectors against HTML.
+    """
+
+    def __init__(
+        self,
+        playlists: int = 20,
+        rows: int = 100,
+        hit_every: int = 0,
+        ipc: float = 0.0,
+        bulk: bool = True,
+    ):
+        self.ipc: float = ipc
+        self.bulk: bool = bulk
+        self.current_url: str = ""
+        self.pages: List[str] = []
+        self.opened: int = 0
+        self.cdp: List[str] = []
+        self.calls: int = 0
+        self.tabs: Dict[str, str] = {"tab0": ""}
+        self.current_window_handle: str = "tab0"
+        self.switch_to = FakeSwitchTo(self)
+        artists = [
+            "Bench Artist" if hit_every and i % hit_every == 0 else "Someone Else"
+            for i in range(rows)
+        ]
+        self.cards = [
+            FakeElement(
+                self,
+                children={
+                    "a": FakeElement(
+                        self,
+                        attributes={
+                            "href": f"https://music.apple.com/us/playlist/p/pl.{i}"
+                        },
+                    )
+                },
+            )
+            for i in range(playlists)
+        ]
+        self.songs = [
+            FakeElement(
+                self,
+                children={
+                    "songs-list-row__song-name": FakeElement(self, f"Track {i}"),
+                    "songs-list-row__by-line": FakeElement(self, artist),
+                },
+            )
+            for i, artist in enumerate(artists)
+        ]
+        self.albums = [
+            FakeElement(
+                self,
+                children={
+                    ALBUM_ARTIST: FakeElement(self, artist),
+                    "product-lockup__title-link": FakeElement(self, f"Album {i}"),
+                },
+            )
+            for i, artist in enumerate(artists)
+        ]
+
+    def call(self) -> None:
+        self.calls += 1
+        if self.ipc:
+            time.sleep(self.ipc)
+
+    @property
+    def window_handles(self) -> List[str]:
+        return list(self.tabs)
+
+    def get(self, url: str) -> None:
+        self.call()
+        self.current_url = url
+        self.tabs[self.current_window_handle] = url
+        self.pages.append(url)
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        self.call()
+        self.cdp.append(cmd)
+        return {}
+
+    def execute_script(self, script: str, *args):
+        """
+        Only the blank window.open and window.location navigation the browser
+        pool uses to load tabs, and the scraper's chart row scripts
+        """
+        self.call()
+        if script.startswith("window.open("):
+            self.opened += 1
+            self.tabs[f"tab{self.opened}"] = "about:blank"
+        elif script.startswith("window.location.href"):
+            self.get(args[0])
+        elif self.bulk and "songs-list-row" in script:
+            return [
+                [
+                    r.children["songs-list-row__song-name"]._text,
+                    r.children["songs-list-row__by-line"]._text,
+                ]
+                for r in self.songs
+            ]
+        elif self.bulk and "product-lockup" in script:
+            return [
+                [
+                    r.children["product-lockup__title-link"]._text,
+                    r.children[ALBUM_ARTIST]._text,
+                ]
+                for r in self.albums
+            ]
+        return None
+
+    def close(self) -> None:
+        self.call()
+        del self.tabs[self.current_window_handle]
+
+    def refresh(self) -> None:
+        self.call()
+
+    def find_elements(self, by, value) -> List[FakeElement]:
+        self.call()
+        if by == By.CLASS_NAME and value == "grid-item":
+            return self.cards
+        if by == By.CLASS_NAME and value == "songs-list-row":
+            return self.songs
+        if by == By.XPATH and value == ALBUM_ROWS:
+            return self.albums
+        return []
+
+    def quit(self) -> None:
+        pass
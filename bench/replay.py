@@ -0,0 +1,517 @@
+"""
+Record music.apple.com room pages once, then replay them offline to time and
+check the Apple scrapers without Chrome or the network.
+
+    python -m bench.replay                      # replay bench/fixtures, or synthetic pages
+    python -m bench.replay --check              # fail if rows differ from the manifest
+    python -m bench.replay --ipc 0.002          # charge each WebDriver command
+    python -m bench.replay --record song:us/room/993297955 album:us/room/1532319379
+
+Recording needs Chrome where the Lambda image has it. It saves each rendered
+page with the rows the scraper read from it into bench/fixtures/manifest.json,
+so a selector change can be replayed against pages from before the change.
+Replay parses the saved HTML into a DOM that ReplayDriver serves to the
+scrapers, and ReplayServer serves the same pages over HTTP for the page data
+path (or a real Chrome pointed at it).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from html import escape
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Tuple, Union
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+from bench.fake_driver import FakeSwitchTo
+from bench.stub import BENCH_ARTIST, artist_for, make_room
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+MANIFEST = "manifest.json"
+VOID_TAGS = {"area", "br", "col", "embed", "hr", "img", "input", "link", "meta"}
+HIDDEN_TAGS = {"script", "style", "template"}
+STEP = re.compile(r'^([\w*-]+)(?:\[(\d+)\]|\[@([\w-]+)="([^"]*)"\])?$')
+
+
+class Node(object):
+    def __init__(self, tag: str, attrs: Dict[str, str], parent=None):
+        self.tag: str = tag
+        self.attrs: Dict[str, str] = attrs
+        self.parent: Union[None, Node] = parent
+        self.children: List[Node] = []
+        self.text_parts: List[Union[str, Node]] = []
+
+    def iter(self) -> Iterator["Node"]:
+        yield self
+        for child in self.children:
+            yield from child.iter()
+
+    def text(self) -> str:
+        """
+        Text content with whitespace collapsed, as Selenium's .text reports it
+        """
+        parts = []
+        for part in self.text_parts:
+            if isinstance(part, Node):
+                if part.tag not in HIDDEN_TAGS:
+                    parts.append(part.text())
+            else:
+                parts.append(part)
+        return " ".join(" ".join(parts).split())
+
+    def has_class(self, name: str) -> bool:
+        return name in self.attrs.get("class", "").split()
+
+
+class DomBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root: Node = Node("#document", {})
+        self.current: Node = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: v or "" for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        self.current.text_parts.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.text_parts.append(data)
+
+
+def parse_html(html: str) -> Node:
+    builder = DomBuilder()
+    builder.feed(html)
+    builder.close()
+    return builder.root
+
+
+def xpath(context: Node, expr: str) -> List[Node]:
+    """
+    The XPath subset the scrapers use: child and descendant steps on a tag
+    or *, each with an optional [n] position or [@attr="value"] test
+    """
+    nodes, descendant = [context], False
+    parts = expr[1:].split("/") if expr.startswith(".") else expr.split("/")
+    for i, part in enumerate(parts):
+        if not part:
+            descendant = i > 0
+            continue
+        step = STEP.match(part)
+        if not step:
+            raise ValueError(f"Unsupported XPath step {part!r} in {expr!r}")
+        tag, position, attr, value = step.groups()
+        found: Dict[int, Node] = {}
+        for node in nodes:
+            for parent in node.iter() if descendant else [node]:
+                matching = [
+                    c
+                    for c in parent.children
+                    if tag in ("*", c.tag)
+                    and (attr is None or c.attrs.get(attr) == value)
+                ]
+                if position:
+                    matching = matching[int(position) - 1 : int(position)]
+                for child in matching:
+                    found.setdefault(id(child), child)
+        nodes, descendant = list(found.values()), False
+    return nodes
+
+
+def select(context: Node, by: str, value: str) -> List[Node]:
+    if by == By.CLASS_NAME:
+        return [n for n in context.iter() if n is not context and n.has_class(value)]
+    if by == By.TAG_NAME:
+        return [n for n in context.iter() if n is not context and n.tag == value]
+    if by == By.XPATH:
+        return xpath(context, value)
+    raise ValueError(f"ReplayDriver does not support {by} locators")
+
+
+class ReplayElement(object):
+    def __init__(self, driver: "ReplayDriver", node: Node):
+        self.driver: ReplayDriver = driver
+        self.node: Node = node
+
+    @property
+    def text(self) -> str:
+        self.driver.call()
+        return self.node.text()
+
+    def get_attribute(self, name: str) -> Union[None, str]:
+        self.driver.call()
+        return self.node.attrs.get(name)
+
+    def find_elements(self, by, value) -> List["ReplayElement"]:
+        self.driver.call()
+        return [ReplayElement(self.driver, n) for n in select(self.node, by, value)]
+
+    def find_element(self, by, value) -> "ReplayElement":
+        self.driver.call()
+        found = select(self.node, by, value)
+        if not found:
+            raise NoSuchElementException(value)
+        return ReplayElement(self.driver, found[0])
+
+
+class ReplayDriver(object):
+    """
+    WebDriver stand-in serving recorded pages by url path, with tabs, the
+    scrapers' locators and their chart row scripts
+
+    :param pages: url path, e.g. "us/room/993297955" -> page html
+    :param ipc: seconds each WebDriver command takes, as in FakeDriver
+    :param bulk: answer the chart row scripts, False to force the scraper's
+        per-element fallback
+    """
+
+    def __init__(self, pages: Dict[str, str], ipc: float = 0.0, bulk: bool = True):
+        self.pages: Dict[str, str] = pages
+        self.ipc: float = ipc
+        self.bulk: bool = bulk
+        self.calls: int = 0
+        self.current_url: str = ""
+        self.tabs: Dict[str, str] = {"tab0": ""}
+        self.current_window_handle: str = "tab0"
+        self.switch_to = FakeSwitchTo(self)
+        self._opened: int = 0
+        self._documents: Dict[str, Node] = {}
+
+    def call(self) -> None:
+        self.calls += 1
+        if self.ipc:
+            time.sleep(self.ipc)
+
+    @property
+    def window_handles(self) -> List[str]:
+        return list(self.tabs)
+
+    @property
+    def document(self) -> Node:
+        path = urlparse(self.current_url).path.strip("/")
+        if path not in self._documents:
+            self._documents[path] = parse_html(self.pages.get(path, "<html></html>"))
+        return self._documents[path]
+
+    @property
+    def page_source(self) -> str:
+        self.call()
+        return self.pages.get(urlparse(self.current_url).path.strip("/"), "")
+
+    def get(self, url: str) -> None:
+        self.call()
+        self.current_url = url
+        self.tabs[self.current_window_handle] = url
+
+    def refresh(self) -> None:
+        self.call()
+
+    def close(self) -> None:
+        self.call()
+        del self.tabs[self.current_window_handle]
+
+    def quit(self) -> None:
+        pass
+
+    def find_elements(self, by, value) -> List[ReplayElement]:
+        self.call()
+        return [ReplayElement(self, n) for n in select(self.document, by, value)]
+
+    def execute_cdp_cmd(self, cmd: str, params: dict) -> dict:
+        self.call()
+        return {}
+
+    def execute_script(self, script: str, *args):
+        self.call()
+        if script.startswith("window.open("):
+            self._opened += 1
+            self.tabs[f"tab{self._opened}"] = "about:blank"
+        elif script.startswith("window.location.href"):
+            self.get(args[0])
+        elif "document.readyState" in script:
+            return "complete"
+        elif self.bulk and "songs-list-row" in script:
+            rows = []
+            for row in select(self.document, By.CLASS_NAME, "songs-list-row"):
+                name = select(row, By.CLASS_NAME, "songs-list-row__song-name")
+                by_line = select(row, By.CLASS_NAME, "songs-list-row__by-line")
+                rows.append(
+                    [
+                        name[0].text() if name else None,
+                        by_line[0].text() if by_line else None,
+                    ]
+                )
+            return rows
+        elif self.bulk and "product-lockup" in script:
+            rows = []
+            for row in xpath(self.document, args[0]):
+                artist = xpath(row, args[1])
+                album = select(row, By.CLASS_NAME, "product-lockup__title-link")
+                if artist and album:
+                    rows.append([album[0].text(), artist[0].text()])
+            return rows
+        return None
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        page = self.server.pages.get(urlparse(self.path).path.strip("/"))
+        body = (page or "not found").encode()
+        self.send_response(200 if page is not None else 404)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class ReplayServer(object):
+    """
+    Serve recorded pages on localhost, e.g.
+
+        with ReplayServer(pages) as server:
+            client.web_root = server.url
+    """
+
+    def __init__(self, pages: Dict[str, str]):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ReplayHandler)
+        self.server.daemon_threads = True
+        self.server.pages = pages
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}/"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def fixture_file(path: str) -> str:
+    return path.strip("/").replace("/", "_") + ".html"
+
+
+def load_fixtures(directory: str) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """
+    :return: pages by url path and their manifest entries, empty when
+        nothing has been recorded in directory
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}, {}
+    pages = {}
+    for path, entry in manifest.items():
+        with open(os.path.join(directory, entry["file"]), encoding="utf-8") as f:
+            pages[path] = f.read()
+    return pages, manifest
+
+
+def synthetic_fixtures(
+    playlists: int = 60, rows: int = 100, hit_every: int = 40
+) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+    """
+    A playlist room, a song chart and an album chart in the markup the
+    scrapers' selectors expect, each also carrying the stub's page data
+    """
+    head = make_room(playlists, rows, hit_every).split("<body>")[0]
+    credits = [(i, artist_for(i, hit_every)) for i in range(rows)]
+    cards = "".join(
+        f'<div class="grid-item"><a href="https://music.apple.com/us/playlist/p/pl.{i}">'
+        f"Playlist {i}</a></div>"
+        for i in range(playlists)
+    )
+    songs = "".join(
+        f'<div class="songs-list-row"><div class="songs-list-row__song-name">'
+        f'Track {i}</div><div class="songs-list-row__by-line"><span>'
+        f"<a>{escape(artist)}</a></span></div></div>"
+        for i, artist in credits
+    )
+    albums = "".join(
+        '<li><div class="product-lockup"><div class="artwork"></div><div>'
+        f'<div><div><a class="product-lockup__title-link">Album {i}</a></div>'
+        f"<p><div><span><a>{escape(artist)}</a></span></div></p></div>"
+        "</div></div></li>"
+        for i, artist in credits
+    )
+    main = '<div id="scrollable-page"><main><div><div><div><ul>{}</ul></div></div></div></main></div>'
+    bodies = {
+        "us/room/900000001": ("playlist", f"<div>{cards}</div>"),
+        "us/room/900000002": ("song", f"<div>{songs}</div>"),
+        "us/room/900000003": ("album", main.format(albums)),
+    }
+    pages, manifest = {}, {}
+    for path, (kind, body) in bodies.items():
+        pages[path] = f"{head}<body>{body}</body></html>"
+        manifest[path] = {"file": fixture_file(path), "kind": kind}
+        if kind == "playlist":
+            manifest[path]["ids"] = [f"pl.{i}" for i in range(playlists)]
+        else:
+            label = "Track" if kind == "song" else "Album"
+            manifest[path]["rows"] = [[f"{label} {i}", a] for i, a in credits]
+    return pages, manifest
+
+
+def scraped(client, path: str, entry: Dict) -> List:
+    """
+    Rows, or playlist ids, the scraper reads from the page at path
+    """
+    url = client.web_root + path
+    if entry["kind"] == "playlist":
+        client.scrape_playlist_ids(url)
+        return client.playlist_ids
+    rows = client.scrape_charts({url: entry["kind"]}, BENCH_ARTIST)
+    return [list(row) for row in rows.get(url, [])]
+
+
+def from_page_data(client, path: str, entry: Dict) -> List:
+    items = [
+        i
+        for i in client.room_items(client.web_root + path)
+        if i["kind"] == entry["kind"]
+    ]
+    if entry["kind"] == "playlist":
+        return [i["id"] for i in items]
+    return [[i["title"], i["artist"]] for i in items]
+
+
+def record(apple, targets: List[str], directory: str) -> None:
+    """
+    :param targets: "kind:url path" with kind song, album or playlist
+    """
+    client = apple.AppleMusicAPI(
+        apple.APPLE_PRIVATE_KEY, apple.APPLE_KEY_ID, apple.APPLE_TEAM_ID, None, ""
+    )
+    _, manifest = load_fixtures(directory)
+    os.makedirs(directory, exist_ok=True)
+    for target in targets:
+        kind, path = target.split(":", 1)
+        url = client.web_root + path.strip("/")
+        driver = client.browser.get(url)
+        if kind == "playlist":
+            client.scrape_playlist_ids(url)
+            entry = {"ids": client.playlist_ids}
+        elif kind == "song":
+            entry = {"rows": [list(r) for r in client.scrape_songs(url, "")]}
+        else:
+            entry = {"rows": [list(r) for r in client.scrape_albums(url)]}
+        entry.update(
+            file=fixture_file(path),
+            kind=kind,
+            recorded_at=datetime.now(timezone.utc).isoformat(),
+        )
+        with open(os.path.join(directory, entry["file"]), "w", encoding="utf-8") as f:
+            f.write(driver.page_source)
+        manifest[path.strip("/")] = entry
+        print(f"Recorded {path}: {len(entry.get('rows') or entry['ids'])} {kind} rows")
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
+    client.browser.recycle()
+
+
+def replay(
+    apple, pages: Dict[str, str], manifest: Dict[str, Dict], ipc: float, check: bool
+) -> bool:
+    def client(driver: Union[None, ReplayDriver]):
+        return apple.AppleMusicAPI(
+            apple.APPLE_PRIVATE_KEY,
+            apple.APPLE_KEY_ID,
+            apple.APPLE_TEAM_ID,
+            driver,
+            BENCH_ARTIST,
+        )
+
+    selectors = ReplayDriver(pages, ipc=ipc, bulk=False)
+    script = ReplayDriver(pages, ipc=ipc)
+    page_data = client(None)
+    modes: List[Tuple[str, object, Callable, Callable[[], int]]] = [
+        ("selectors", client(selectors), scraped, lambda: selectors.calls),
+        ("script", client(script), scraped, lambda: script.calls),
+        ("page data", page_data, from_page_data, lambda: 0),
+    ]
+
+    ok = True
+    print(
+        f"{'mode':<10} {'page':<20} {'kind':<9} {'rows':>6} {'secs':>8} "
+        f"{'rows/s':>9} {'calls':>6}"
+    )
+    with ReplayServer(pages) as server:
+        page_data.web_root = server.url
+        for label, api, read, calls in modes:
+            for path, entry in manifest.items():
+                before, start = calls(), time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    rows = read(api, path, entry)
+                secs = time.perf_counter() - start
+                print(
+                    f"{label:<10} {path:<20} {entry['kind']:<9} {len(rows):6d} "
+                    f"{secs:8.4f} {len(rows) / secs if secs else 0:9.0f} "
+                    f"{calls() - before:6d}"
+                )
+                expected = (
+                    entry.get("ids")
+                    if entry["kind"] == "playlist"
+                    else entry.get("rows")
+                )
+                if check and label != "page data" and rows != expected:
+                    print(f"{label}: {path} rows differ from the manifest")
+                    ok = False
+    return ok
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--dir", default=FIXTURES)
+    parser.add_argument("--ipc", type=float, default=0.0)
+    parser.add_argument("--check", action="store_true")
+    parser.add_argument("--record", nargs="+", metavar="KIND:PATH")
+    args = parser.parse_args()
+
+    # the bench sets up the Apple environment before importing the client
+    from bench.bench_find_artist import apple
+
+    if args.record:
+        record(apple, args.record, args.dir)
+        return 0
+
+    pages, manifest = load_fixtures(args.dir)
+    if not manifest:
+        print(f"No recordings in {args.dir}, replaying synthetic pages")
+        pages, manifest = synthetic_fixtures()
+    ok = replay(apple, pages, manifest, args.ipc, args.check)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,390 @@
+import json
+import threading
+from time import sleep
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+from urllib.parse import parse_qs, urlencode, urlparse
+
+MARKETS = [f"{a}{b}" for a in "ABCDEFGHIJKLM" for b in "ABCDEFGHIJKLMN"]
+BENCH_ARTIST = "Bench Artist"
+OTHER_ARTIST = "Someone Else"
+
+
+def make_playlists(count: int) -> List[Dict[str, str]]:
+    return [
+        {"id": f"pl{i}", "name": f"Playlist {i}", "snapshot_id": f"snap{i}"}
+        for i in range(count)
+    ]
+
+
+def make_artist(name: str) -> Dict:
+    artist_id = name.lower().replace(" ", "")
+    return {
+        "external_urls": {"spotify": f"https://open.spotify.com/artist/{artist_id}"},
+        "href": f"https://api.spotify.com/v1/artists/{artist_id}",
+        "id": artist_id,
+        "name": name,
+        "type": "artist",
+        "uri": f"spotify:artist:{artist_id}",
+    }
+
+
+def artist_for(i: int, hit_every: int) -> str:
+    return BENCH_ARTIST if hit_every and i % hit_every == 0 else OTHER_ARTIST
+
+
+def make_tracks(count: int, hit_every: int = 0) -> List[Dict]:
+    """
+    Playlist track items shaped like the full objects api.spotify.com returns
+    """
+    return [
+        {
+            "added_at": "2024-09-06T04:00:00Z",
+            "added_by": {"id": "spotify", "type": "user"},
+            "is_local": False,
+            "track": {
+                "name": f"Track {i}",
+                "id": f"track{i}",
+                "available_markets": MARKETS,
+                "duration_ms": 180000 + i,
+                "explicit": False,
+                "popularity": i % 100,
+                "preview_url": f"https://p.scdn.co/mp3-preview/track{i}",
+                "external_ids": {"isrc": f"USAAA24{i:05d}"},
+                "artists": [make_artist(artist_for(i, hit_every))],
+                "album": {
+                    "name": f"Album {i}",
+                    "album_type": "single",
+                    "available_markets": MARKETS,
+                    "release_date": "2024-09-06",
+                    "images": [
+                        {"url": f"https://i.scdn.co/image/{i}/{size}", "height": size}
+                        for size in (640, 300, 64)
+                    ],
+                    "artists": [make_artist(artist_for(i, hit_every))],
+                },
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def make_apple_tracks(count: int, hit_every: int = 0) -> List[Dict]:
+    return [
+        {
+            "id": f"{1000000 + i}",
+            "type": "songs",
+            "attributes": {
+                "name": f"Track {i}",
+                "artistName": artist_for(i, hit_every),
+                "albumName": f"Album {i}",
+                "durationInMillis": 180000 + i,
+                "genreNames": ["Hip-Hop/Rap", "Music"],
+                "artwork": {
+                    "url": "https://is1-ssl.mzstatic.com/image/{w}x{h}bb.jpg",
+                    "width": 3000,
+                    "height": 3000,
+                },
+            },
+        }
+        for i in range(count)
+    ]
+
+
+def make_room(playlists: int, count: int, hit_every: int = 0) -> str:
+    """
+    A music.apple.com room page carrying its contents as serialized-server-data
+    JSON, with playlist, song and album sections so any room id can stand in
+    for a genre room or a chart
+    """
+
+    def lockup(kind: str, store_id: str, title: str, **extra) -> Dict:
+        return dict(
+            title=title,
+            contentDescriptor={
+                "kind": kind,
+                "identifiers": {"storeAdamID": store_id},
+                "url": f"https://music.apple.com/us/{kind}/x/{store_id}",
+            },
+            **extra,
+        )
+
+    sections = [
+        {
+            "id": "playlists",
+            "items": [
+                lockup("playlist", f"pl.{i}", f"Playlist {i}") for i in range(playlists)
+            ],
+        },
+        {
+            "id": "songs",
+            "items": [
+                lockup(
+                    "song",
+                    f"{2000000 + i}",
+                    f"Track {i}",
+                    artistName=artist_for(i, hit_every),
+                )
+                for i in range(count)
+            ],
+        },
+        {
+            "id": "albums",
+            "items": [
+                lockup(
+                    "album",
+                    f"{3000000 + i}",
+                    f"Album {i}",
+                    subtitleLinks=[{"title": artist_for(i, hit_every)}],
+                )
+                for i in range(count)
+            ],
+        },
+    ]
+    data = json.dumps([{"data": {"sections": sections}}])
+    return (
+        "<!DOCTYPE html><html><head>"
+        f'<script type="application/json" id="serialized-server-data">{data}</script>'
+        "</head><body></body></html>"
+    )
+
+
+def parse_fields(fields: str) -> dict:
+    """
+    Parse a Spotify fields= filter into the projection dict it was built from
+    """
+    projection, stack, key = {}, [], ""
+    current = projection
+    for char in fields + ",":
+        if char == "(":
+            current[key] = {}
+            stack.append(current)
+            current, key = current[key], ""
+        elif char in ",)":
+            if key:
+                current[key] = None
+            key = ""
+            if char == ")":
+                current = stack.pop()
+        else:
+            key += char
+    return projection
+
+
+def apply_fields(data, projection):
+    if projection is None:
+        return data
+    if isinstance(data, list):
+        return [apply_fields(d, projection) for d in data]
+    return {k: apply_fields(data[k], sub) for k, sub in projection.items() if k in data}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Stand-in for accounts.spotify.com, api.spotify.com and api.music.apple.com
+    """
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes", len(body))
+
+    def _send_html(self, page: str):
+        body = page.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self.server.count("bytes", len(body))
+
+    def _throttled(self) -> bool:
+        """
+        Count the request, sleep the configured latency and inject 429s
+        """
+        server = self.server
+        n = server.count("requests")
+        if server.latency:
+            # bound at import so benches that patch time.sleep still get latency
+            sleep(server.latency)
+        if server.rate_limit_every and n % server.rate_limit_every == 0:
+            server.count("rate_limited")
+            self._send_json(
+                {"error": {"status": 429}},
+                status=429,
+                headers={"Retry-After": str(server.retry_after)},
+            )
+            return True
+        return False
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        if self._throttled():
+            return
+        if self.path == "/api/token":
+            self._send_json({"access_token": "stub_token", "expires_in": 3600})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_GET(self):
+        if self._throttled():
+            return
+        url = urlparse(self.path)
+        parts = url.path.strip("/").split("/")
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if parts[:2] == ["us", "room"]:
+            self._send_html(self.server.room)
+        elif parts[:3] == ["v1", "browse", "categories"]:
+            self._send_json({"playlists": self._page(self.server.playlists, query, 50)})
+        elif parts[:2] == ["v1", "playlists"] and parts[-1] == "tracks":
+            resp = self._page(self.server.tracks, query, self.server.track_page_limit)
+            if "fields" in query:
+                resp = apply_fields(resp, parse_fields(query["fields"]))
+            self._send_json(resp)
+        elif parts[:4] == ["v1", "catalog", "us", "playlists"]:
+            if parts[5:] == ["tracks"]:
+                self._send_json(self._apple_tracks(parts[4], query))
+                return
+            if len(parts) > 4:
+                playlist_ids = parts[4:5]
+            else:
+                playlist_ids = query.get("ids", "").split(",")[:25]
+            self._send_json(
+                {"data": [self._apple_playlist(pl) for pl in playlist_ids if pl]}
+            )
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _apple_playlist(self, playlist_id: str) -> dict:
+        return {
+            "id": playlist_id,
+            "type": "playlists",
+            "attributes": {"name": f"Apple {playlist_id}"},
+            "relationships": {"tracks": self._apple_tracks(playlist_id, {})},
+        }
+
+    def _apple_tracks(self, playlist_id: str, query: Dict[str, str]) -> dict:
+        """
+        A tracks relationship page; Apple truncates the one inlined in the
+        playlist and links the rest with a relative next
+        """
+        tracks = self.server.apple_tracks
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", 100)), 100)
+        page = {"data": tracks[offset : offset + limit], "meta": {"total": len(tracks)}}
+        if offset + limit < len(tracks):
+            path = f"/v1/catalog/us/playlists/{playlist_id}/tracks"
+            page["next"] = f"{path}?offset={offset + limit}"
+        return page
+
+    def _page(self, items: List, query: Dict[str, str], max_limit: int) -> dict:
+        offset = int(query.get("offset", 0))
+        limit = min(int(query.get("limit", max_limit)), max_limit)
+        page = items[offset : offset + limit]
+        next_url = None
+        if offset + limit < len(items):
+            params = dict(query, offset=offset + limit, limit=limit)
+            params.pop("fields", None)
+            next_url = (
+                f"{self.server.url}{urlparse(self.path).path}?{urlencode(params)}"
+            )
+        return {
+            "items": page,
+            "limit": limit,
+            "offset": offset,
+            "next": next_url,
+            "total": len(items),
+        }
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, **config):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.latency: float = config.get("latency", 0.0)
+        self.rate_limit_every: int = config.get("rate_limit_every", 0)
+        self.retry_after: float = config.get("retry_after", 0.1)
+        self.track_page_limit: int = config.get("track_page_limit", 100)
+        hit_every = config.get("hit_every", 0)
+        self.playlists = make_playlists(config.get("playlists", 50))
+        self.tracks = make_tracks(config.get("tracks", 100), hit_every)
+        self.apple_tracks = make_apple_tracks(config.get("tracks", 100), hit_every)
+        self.room = "<!DOCTYPE html><html><body></body></html>"
+        if config.get("room_data", True):
+            self.room = make_room(
+                config.get("playlists", 50), config.get("tracks", 100), hit_every
+            )
+        self.stats: Dict[str, int] = {"requests": 0, "bytes": 0, "rate_limited": 0}
+        self._lock = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address
+        return f"http://{host}:{port}"
+
+    def count(self, key: str, n: int = 1) -> int:
+        with self._lock:
+            self.stats[key] += n
+            return self.stats[key]
+
+
+class ApiStub:
+    """
+    Run the stub server on a background thread, e.g.
+
+        with ApiStub(latency=0.02, rate_limit_every=50) as stub:
+            api.api_root = stub.api_root
+
+    :param latency: seconds added to every response
+    :param rate_limit_every: answer every Nth request with a 429, 0 never
+    :param retry_after: Retry-After seconds sent with injected 429s
+    :param playlists: playlists listed under every category
+    :param tracks: tracks in every playlist
+    :param track_page_limit: largest tracks page the stub will return
+    :param hit_every: credit every Nth track to BENCH_ARTIST, 0 never
+    :param room_data: embed serialized-server-data in room pages, False to
+        serve bare pages that force the browser fallback
+    """
+
+    def __init__(self, **config):
+        self.server = StubServer(**config)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    @property
+    def api_root(self) -> str:
+        return f"{self.url}/v1"
+
+    @property
+    def token_url(self) -> str:
+        return f"{self.url}/api/token"
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return dict(self.server.stats)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,4 @@
+import os
+
+# main creates its Lambda client at import, which needs a region
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
@@ -1,14 +1,45 @@
 import boto3
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from botocore.exceptions import ClientError
+from typing import Callable, Dict, List, Union
 
 lambda_client = boto3.client("lambda")
 
+DEFAULT_ROSTER = [
+    {
+        "artist": "Steinza",
+        "genres": {
+            "s": [
+                "0JQ5DAqbMKFy78wprEpAjl",
+                "0JQ5DAqbMKFKLfwjuJMoNC",
+                "0JQ5DAqbMKFCWjUTdzaG0e",
+            ],
+            "am": ["993289542", "1528193954", "1223622007", "6723904830"],
+        },
+    },
+    {
+        "artist": "Dave Blunts",
+        "genres": {
+            "s": [
+                "0JQ5DAqbMKFQIL0AXnG5AK",
+                "0JQ5DAqbMKFQ00XGBls6ym",
+            ],
+            "am": ["1533338569", "993297962"],
+        },
+    },
+]
+
 
 def invoke_lambda_with_artists(artists_payload, function_name):
-    print(f"Invoking {function_name} for {artists_payload['artist']}")
+    if "tracks" in artists_payload:
+        artists = ", ".join(p["artist"] for p in artists_payload["tracks"])
+    else:
+        artists = artists_payload["artist"]
+    print(f"Invoking {function_name} for {artists}")
     response = lambda_client.invoke(
         FunctionName=function_name,
         InvocationType="Event",
@@ -17,6 +48,135 @@ def invoke_lambda_with_artists(artists_payload, function_name):
     return response
 
 
+def load_roster(event: Union[None, dict] = None) -> List[dict]:
+    """
+    The artists to scan: the event's own "tracks" when it has them, then
+    STORE_TURN_ROSTER_BUCKET/STORE_TURN_ROSTER_KEY on S3, then the JSON file
+    at STORE_TURN_ROSTER_FILE, then DEFAULT_ROSTER. Either source holds a
+    list of artists or {"tracks": [...]}.
+    """
+    if event and event.get("tracks"):
+        return event["tracks"]
+
+    roster = None
+    bucket = os.getenv("STORE_TURN_ROSTER_BUCKET")
+    path = os.getenv("STORE_TURN_ROSTER_FILE")
+    try:
+        if bucket:
+            key = os.getenv("STORE_TURN_ROSTER_KEY", "roster.json")
+            obj = boto3.client("s3").get_object(Bucket=bucket, Key=key)
+            roster = json.loads(obj["Body"].read())
+        elif path:
+            with open(path) as f:
+                roster = json.load(f)
+    except (ClientError, OSError, ValueError) as e:
+        print(f"Could not load the roster, using the default: {e}")
+        return DEFAULT_ROSTER
+
+    if isinstance(roster, dict):
+        roster = roster.get("tracks")
+    return roster or DEFAULT_ROSTER
+
+
+class Target(object):
+    """
+    A Lambda the roster is fanned out to
+    :param function_name: Lambda to invoke
+    :param max_concurrency: invoke calls in flight at once. Calls are
+        asynchronous, so this does not bound how many of the target run at
+        once; its reserved concurrency does, and Lambda queues the rest
+    :param roster_batch: artists per invocation for a Lambda that takes
+        {"tracks": [...]} in roster mode, 0 to invoke once per artist
+    """
+
+    def __init__(self, function_name: str, max_concurrency: int, roster_batch: int):
+        self.function_name: str = function_name
+        self.max_concurrency: int = max(1, max_concurrency)
+        self.roster_batch: int = roster_batch
+
+    def payloads(self, roster: List[dict]) -> List[dict]:
+        if not self.roster_batch:
+            return list(roster)
+        return [
+            {"tracks": roster[i : i + self.roster_batch]}
+            for i in range(0, len(roster), self.roster_batch)
+        ]
+
+
+def targets_from_env() -> List[Target]:
+    # Apple runs Chrome per invocation, so it gets far fewer at once. Set
+    # APPLE_DISPATCH_CONCURRENCY from the same value as store-turn-apple's
+    # reserved concurrency, which is what actually caps its containers
+    return [
+        Target(
+            "store-turn-spotify",
+            int(os.getenv("SPOTIFY_DISPATCH_CONCURRENCY", "4")),
+            int(os.getenv("SPOTIFY_ROSTER_BATCH", "25")),
+        ),
+        Target(
+            "store-turn-apple",
+            int(os.getenv("APPLE_DISPATCH_CONCURRENCY", "2")),
+            0,
+        ),
+    ]
+
+
+class Dispatcher(object):
+    """
+    Invoke every target for the roster, all targets at once, each through
+    its own pool capped at the target's max_concurrency, timing each call
+    """
+
+    def __init__(
+        self,
+        targets: List[Target],
+        invoke: Callable[[dict, str], dict] = invoke_lambda_with_artists,
+    ):
+        self.targets: List[Target] = targets
+        self.invoke: Callable[[dict, str], dict] = invoke
+        self.latencies: Dict[str, List[float]] = {}
+        self.failures: Dict[str, List[str]] = {}
+        self.elapsed: float = 0.0
+
+    def _invoke(self, payload: dict, function_name: str) -> None:
+        start = time.monotonic()
+        try:
+            response = self.invoke(payload, function_name)
+            print(response)
+        except Exception as e:
+            # a malformed roster entry fails here too; count it, don't lose it
+            print(f"Error invoking {function_name}: {e!r}")
+            self.failures[function_name].append(repr(e))
+        self.latencies[function_name].append(time.monotonic() - start)
+
+    def dispatch(self, roster: List[dict]) -> None:
+        start = time.monotonic()
+        pools = []
+        for target in self.targets:
+            self.latencies[target.function_name] = []
+            self.failures[target.function_name] = []
+            pool = ThreadPoolExecutor(max_workers=target.max_concurrency)
+            for payload in target.payloads(roster):
+                pool.submit(self._invoke, payload, target.function_name)
+            pools.append(pool)
+        for pool in pools:
+            pool.shutdown(wait=True)
+        self.elapsed = time.monotonic() - start
+
+    def report(self) -> str:
+        lines = [f"Dispatched in {self.elapsed:.2f}s"]
+        for target in self.targets:
+            latencies = self.latencies.get(target.function_name, [])
+            lines.append(
+                f"{target.function_name}: {len(latencies)} invocations "
+                f"({target.max_concurrency} at once), "
+                f"{len(self.failures.get(target.function_name, []))} failed, "
+                f"{max(latencies, default=0.0):.2f}s slowest, "
+                f"{sum(latencies) / max(len(latencies), 1):.2f}s average"
+            )
+        return "\n".join(lines)
+
+
 def send_email_ses():
     ses_client = boto3.client(
         "ses",
@@ -52,37 +212,9 @@ def send_email_ses():
 
 
 def lambda_handler(event, context):
-    artists_payload = {
-        "tracks": [
-            {
-                "artist": "Steinza",
-                "genres": {
-                    "s": [
-                        "0JQ5DAqbMKFy78wprEpAjl",
-                        "0JQ5DAqbMKFKLfwjuJMoNC",
-                        "0JQ5DAqbMKFCWjUTdzaG0e",
-                    ],
-                    "am": ["993289542", "1528193954", "1223622007", "6723904830"],
-                },
-            },
-            {
-                "artist": "Dave Blunts",
-                "genres": {
-                    "s": [
-                        "0JQ5DAqbMKFQIL0AXnG5AK",
-                        "0JQ5DAqbMKFQ00XGBls6ym",
-                    ],
-                    "am": ["1533338569", "993297962"],
-                },
-            },
-        ]
-    }
-    lambda_functions = ["store-turn-spotify", "store-turn-apple"]
-
-    for p in artists_payload["tracks"]:
-        for function_name in lambda_functions:
-            print(f"Invoking {function_name} for {p}")
-            response = invoke_lambda_with_artists(p, function_name)
-            print(response)
+    roster = load_roster(event)
+    dispatcher = Dispatcher(targets_from_env())
+    dispatcher.dispatch(roster)
+    print(dispatcher.report())
     send_email_ses()
     return {"statusCode": 200, "body": "Lambdas invoked"}
@@ -0,0 +1,169 @@
+import io
+import json
+import threading
+import time
+import pytest
+from botocore.exceptions import ClientError
+from unittest.mock import patch, MagicMock
+from run.main import DEFAULT_ROSTER
+from run.main import Dispatcher
+from run.main import Target
+from run.main import load_roster
+from run.main import targets_from_env
+
+ROSTER = [
+    {"artist": f"artist {i}", "genres": {"s": ["0JQ5DAqbMKFy78wprEpAjl"], "am": []}}
+    for i in range(5)
+]
+
+
+@pytest.fixture(autouse=True)
+def roster_env(monkeypatch):
+    for name in (
+        "STORE_TURN_ROSTER_BUCKET",
+        "STORE_TURN_ROSTER_KEY",
+        "STORE_TURN_ROSTER_FILE",
+        "SPOTIFY_DISPATCH_CONCURRENCY",
+        "SPOTIFY_ROSTER_BATCH",
+        "APPLE_DISPATCH_CONCURRENCY",
+    ):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_load_roster_default():
+    assert load_roster() == DEFAULT_ROSTER
+    assert load_roster({"tracks": []}) == DEFAULT_ROSTER
+
+
+def test_load_roster_from_event(monkeypatch):
+    monkeypatch.setenv("STORE_TURN_ROSTER_FILE", "/nonexistent/roster.json")
+    assert load_roster({"tracks": ROSTER}) == ROSTER
+
+
+@pytest.mark.parametrize("content", [ROSTER, {"tracks": ROSTER}])
+def test_load_roster_from_file(content, tmp_path, monkeypatch):
+    path = tmp_path / "roster.json"
+    path.write_text(json.dumps(content))
+    monkeypatch.setenv("STORE_TURN_ROSTER_FILE", str(path))
+
+    assert load_roster({}) == ROSTER
+
+
+def test_load_roster_bad_file(tmp_path, monkeypatch):
+    path = tmp_path / "roster.json"
+    path.write_text("{not json")
+    monkeypatch.setenv("STORE_TURN_ROSTER_FILE", str(path))
+
+    assert load_roster() == DEFAULT_ROSTER
+
+
+@patch("run.main.boto3.client")
+def test_load_roster_from_s3(mock_client, monkeypatch):
+    monkeypatch.setenv("STORE_TURN_ROSTER_BUCKET", "bucket")
+    mock_client.return_value.get_object.return_value = {
+        "Body": io.BytesIO(json.dumps({"tracks": ROSTER}).encode())
+    }
+
+    assert load_roster() == ROSTER
+    mock_client.return_value.get_object.assert_called_once_with(
+        Bucket="bucket", Key="roster.json"
+    )
+
+
+@patch("run.main.boto3.client")
+def test_load_roster_s3_error(mock_client, monkeypatch):
+    monkeypatch.setenv("STORE_TURN_ROSTER_BUCKET", "bucket")
+    mock_client.return_value.get_object.side_effect = ClientError(
+        {"Error": {"Code": "NoSuchKey", "Message": "missing"}}, "GetObject"
+    )
+
+    assert load_roster() == DEFAULT_ROSTER
+
+
+def test_target_payloads():
+    assert Target("store-turn-apple", 2, 0).payloads(ROSTER) == ROSTER
+    assert Target("store-turn-spotify", 4, 2).payloads(ROSTER) == [
+        {"tracks": ROSTER[0:2]},
+        {"tracks": ROSTER[2:4]},
+        {"tracks": ROSTER[4:5]},
+    ]
+
+
+def test_targets_from_env(monkeypatch):
+    monkeypatch.setenv("APPLE_DISPATCH_CONCURRENCY", "3")
+    monkeypatch.setenv("SPOTIFY_ROSTER_BATCH", "10")
+
+    spotify, apple = targets_from_env()
+
+    assert (spotify.function_name, spotify.max_concurrency) == ("store-turn-spotify", 4)
+    assert spotify.roster_batch == 10
+    assert (apple.function_name, apple.max_concurrency) == ("store-turn-apple", 3)
+    assert apple.roster_batch == 0
+
+
+def test_dispatcher_invokes_every_target():
+    calls = []
+    lock = threading.Lock()
+
+    def invoke(payload, function_name):
+        with lock:
+            calls.append((function_name, payload))
+        return {"StatusCode": 202}
+
+    dispatcher = Dispatcher(
+        [Target("store-turn-spotify", 4, 2), Target("store-turn-apple", 2, 0)],
+        invoke=invoke,
+    )
+    dispatcher.dispatch(ROSTER)
+
+    assert sorted(p["artist"] for f, p in calls if f == "store-turn-apple") == [
+        a["artist"] for a in ROSTER
+    ]
+    assert len([f for f, _ in calls if f == "store-turn-spotify"]) == 3
+    assert len(dispatcher.latencies["store-turn-apple"]) == 5
+    assert dispatcher.failures == {"store-turn-spotify": [], "store-turn-apple": []}
+    assert "store-turn-apple: 5 invocations (2 at once), 0 failed" in (
+        dispatcher.report()
+    )
+
+
+def test_dispatcher_caps_calls_in_flight():
+    in_flight = {"now": 0, "max": 0}
+    lock = threading.Lock()
+
+    def invoke(payload, function_name):
+        with lock:
+            in_flight["now"] += 1
+            in_flight["max"] = max(in_flight["max"], in_flight["now"])
+        time.sleep(0.02)
+        with lock:
+            in_flight["now"] -= 1
+        return {"StatusCode": 202}
+
+    Dispatcher([Target("store-turn-apple", 2, 0)], invoke=invoke).dispatch(ROSTER)
+
+    assert in_flight["max"] == 2
+
+
+def test_dispatcher_counts_every_failure():
+    def invoke(payload, function_name):
+        if payload["artist"] == "artist 1":
+            raise ClientError(
+                {"Error": {"Code": "TooManyRequestsException", "Message": "slow"}},
+                "Invoke",
+            )
+        return {"StatusCode": 202}
+
+    dispatcher = Dispatcher([Target("store-turn-apple", 2, 0)], invoke=invoke)
+    dispatcher.dispatch(ROSTER)
+    assert len(dispatcher.failures["store-turn-apple"]) == 1
+
+    # a roster entry without "artist" fails before boto3 is ever called
+    with patch("run.main.lambda_client") as mock_lambda:
+        dispatcher = Dispatcher([Target("store-turn-apple", 2, 0)])
+        dispatcher.dispatch(ROSTER + [{"genres": {}}])
+
+    assert mock_lambda.invoke.call_count == 5
+    assert dispatcher.failures["store-turn-apple"] == ["KeyError('artist')"]
+    assert len(dispatcher.latencies["store-turn-apple"]) == 6
+    assert "6 invocations (2 at once), 1 failed" in dispatcher.report()
@@ -1,13 +1,483 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
 from requests.exceptions import HTTPError
 import time
 from urllib.parse import urlencode
 import base64
+import json
 import os
+import re
+import threading
+import unicodedata
+from abc import ABC, abstractmethod
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import boto3
 from botocore.exceptions import ClientError
-from typing import List, TypedDict, Union, Dict
+from typing import (
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+    Dict,
+)
+
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 16
+MAX_WORKERS = 8
+MAX_RETRIES = 5
+TRACK_PAGE_SIZE = 100
+CATEGORY_PAGE_SIZE = 50
+CACHE_TTL = 60 * 60
+CACHE_MAX_BYTES = 128 * 1024 * 1024
+CACHE_MAX_AGE = 7 * 24 * 60 * 60
+TOKEN_REFRESH_MARGIN = 5 * 60
+RATE_LIMIT = 30
+RATE_BURST = 30
+RAMP_AFTER = 20
+CREDIT_SEPARATORS = re.compile(
+    r"\s*(?:,|&|[()]|\bfeat\b\.?|\bft\b\.?|\bfeaturing\b)\s*"
+)
+
+# The parts of each Spotify object the matcher reads. None marks a leaf.
+PLAYLIST_PROJECTION = {"id": None, "name": None, "snapshot_id": None}
+TRACK_PROJECTION = {
+    "items": {
+        "added_at": None,
+        "track": {
+            "name": None,
+            "artists": {"name": None},
+            "album": {"artists": {"name": None}},
+        },
+    },
+    "next": None,
+    "total": None,
+}
+
+
+def build_fields(projection: dict) -> str:
+    """
+    Build a Spotify fields= filter from a projection
+    :param projection: nested dict of wanted keys, None for leaves
+    :return: filter string, e.g. "items(track(name)),next"
+    """
+    return ",".join(
+        key if sub is None else f"{key}({build_fields(sub)})"
+        for key, sub in projection.items()
+    )
+
+
+def project(data, projection: Union[None, dict]):
+    """
+    Trim a decoded response to the keys in projection, for endpoints without fields=
+    :param data: decoded JSON object or list of objects
+    :param projection: nested dict of wanted keys, None for leaves
+    :return: the projected copy of data
+    """
+    if projection is None:
+        return data
+    if isinstance(data, list):
+        return [project(d, projection) for d in data]
+    return {
+        key: project(data[key], sub) for key, sub in projection.items() if key in data
+    }
+
+
+TRACK_FIELDS = build_fields(TRACK_PROJECTION)
+
+
+def build_session(
+    pool_connections: int = POOL_CONNECTIONS, pool_maxsize: int = POOL_MAXSIZE
+) -> requests.Session:
+    """
+    Build a keep-alive session so auth and catalog calls reuse TCP/TLS connections
+    :param pool_connections: number of hosts to keep connection pools for
+    :param pool_maxsize: connections kept open per host
+    :return: a requests.Session with a tuned HTTPAdapter mounted
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class PlaylistCache(ABC):
+    """
+    Playlist tracks shared across artists, keyed by playlist id + snapshot_id.
+    An entry is {"total", "items", "complete"}; a new snapshot_id replaces it.
+    Spotify changes snapshot_id on every edit, so a matching one never goes
+    stale. Only records stored without a snapshot_id expire after the TTL,
+    and are kept with their ETag so they can be revalidated.
+    """
+
+    def __init__(self, ttl: int = CACHE_TTL):
+        self.ttl: int = ttl
+
+    def is_fresh(self, record: dict) -> bool:
+        return time.time() - record["stored_at"] <= self.ttl
+
+    def get(self, playlist_id: str, snapshot_id: str) -> Union[None, dict]:
+        record = self.load(playlist_id)
+        if record is None or record["snapshot_id"] != snapshot_id:
+            return None
+        if snapshot_id is None and not self.is_fresh(record):
+            return None
+        return record["entry"]
+
+    def put(
+        self, playlist_id: str, snapshot_id: str, entry: dict, etag: str = None
+    ) -> None:
+        record = {
+            "snapshot_id": snapshot_id,
+            "etag": etag,
+            "stored_at": time.time(),
+            "entry": entry,
+        }
+        self.store(playlist_id, record)
+
+    @abstractmethod
+    def load(self, playlist_id: str) -> Union[None, dict]:
+        pass
+
+    @abstractmethod
+    def store(self, playlist_id: str, record: dict) -> None:
+        pass
+
+
+class DiskPlaylistCache(PlaylistCache):
+    """
+    One JSON file per playlist, evicting files past max_age then oldest past max_bytes
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: int = CACHE_TTL,
+        max_bytes: int = CACHE_MAX_BYTES,
+        max_age: int = CACHE_MAX_AGE,
+    ):
+        super().__init__(ttl)
+        self.path: str = path
+        self.max_bytes: int = max_bytes
+        self.max_age: int = max_age
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def _file(self, playlist_id: str) -> str:
+        return os.path.join(self.path, f"{playlist_id}.json")
+
+    def load(self, playlist_id: str) -> Union[None, dict]:
+        try:
+            with open(self._file(playlist_id)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def store(self, playlist_id: str, record: dict) -> None:
+        tmp = f"{self._file(playlist_id)}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(record, f)
+        os.replace(tmp, self._file(playlist_id))
+        self.evict()
+
+    def evict(self) -> None:
+        with self._lock:
+            files = []
+            for name in os.listdir(self.path):
+                if not name.endswith(".json"):
+                    continue
+                try:
+                    stat = os.stat(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, name))
+
+            files.sort()
+            now = time.time()
+            size = sum(f[1] for f in files)
+            for mtime, file_size, name in files:
+                if now - mtime <= self.max_age and size <= self.max_bytes:
+                    break
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except FileNotFoundError:
+                    pass
+                size -= file_size
+
+
+class S3PlaylistCache(PlaylistCache):
+    """
+    Objects under s3://bucket/prefix shared by every Lambda in a run.
+    Bounded by age only: TTL is checked on read and the bucket's lifecycle
+    rule deletes objects after 7 days. Unlike DiskPlaylistCache it has no
+    size limit.
+    """
+
+    def __init__(
+        self, bucket: str, prefix: str = "", ttl: int = CACHE_TTL, client=None
+    ):
+        super().__init__(ttl)
+        self.bucket: str = bucket
+        self.prefix: str = prefix
+        self.client = client or boto3.client("s3")
+
+    def load(self, playlist_id: str) -> Union[None, dict]:
+        try:
+            obj = self.client.get_object(
+                Bucket=self.bucket, Key=f"{self.prefix}{playlist_id}.json"
+            )
+        except ClientError:
+            return None
+        return json.loads(obj["Body"].read())
+
+    def store(self, playlist_id: str, record: dict) -> None:
+        try:
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=f"{self.prefix}{playlist_id}.json",
+                Body=json.dumps(record).encode("utf-8"),
+            )
+        except ClientError as e:
+            print(f"Error caching playlist {playlist_id}: {e}")
+
+
+def cache_from_env() -> Union[None, PlaylistCache]:
+    bucket = os.getenv("SPOTIFY_CACHE_BUCKET")
+    if bucket:
+        return S3PlaylistCache(bucket, os.getenv("SPOTIFY_CACHE_PREFIX", "playlists/"))
+    path = os.getenv("SPOTIFY_CACHE_DIR")
+    if path:
+        return DiskPlaylistCache(path)
+    return None
+
+
+class TokenStore(ABC):
+    """
+    Where access tokens are kept between warm invocations, keyed by client id
+    """
+
+    @abstractmethod
+    def load(self, key: str) -> Union[None, dict]:
+        pass
+
+    @abstractmethod
+    def save(self, key: str, token: dict) -> None:
+        pass
+
+
+class MemoryTokenStore(TokenStore):
+    def __init__(self):
+        self.tokens: Dict[str, dict] = {}
+
+    def load(self, key: str) -> Union[None, dict]:
+        return self.tokens.get(key)
+
+    def save(self, key: str, token: dict) -> None:
+        self.tokens[key] = token
+
+
+# Module level so a warm Lambda container reuses the token of the last invocation
+TOKEN_STORE = MemoryTokenStore()
+
+
+class TokenManager(object):
+    """
+    Thread-safe client-credentials token, {"access_token", "expires_at"}.
+    Expired tokens are fetched before returning; tokens within refresh_margin
+    of expiry are returned while a background thread fetches the next one.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], dict],
+        key: str,
+        store: TokenStore = None,
+        refresh_margin: int = TOKEN_REFRESH_MARGIN,
+    ):
+        self.fetch = fetch
+        self.key: str = key
+        self.store: TokenStore = store if store is not None else TOKEN_STORE
+        self.refresh_margin: int = refresh_margin
+        self.token: Union[None, dict] = None
+        self._refreshing: bool = False
+        self._lock = threading.Lock()
+
+    def get(self) -> dict:
+        with self._lock:
+            if self.token is None:
+                self.token = self.store.load(self.key)
+
+            now = time.time()
+            if self.token is None or now >= self.token["expires_at"]:
+                self.token = self.fetch()
+                self.store.save(self.key, self.token)
+            elif (
+                now >= self.token["expires_at"] - self.refresh_margin
+                and not self._refreshing
+            ):
+                self._refreshing = True
+                threading.Thread(target=self.refresh_in_background, daemon=True).start()
+            return self.token
+
+    def refresh(self) -> dict:
+        with self._lock:
+            self.token = self.fetch()
+            self.store.save(self.key, self.token)
+            return self.token
+
+    def refresh_in_background(self) -> None:
+        try:
+            token = self.fetch()
+            self.store.save(self.key, token)
+            with self._lock:
+                self.token = token
+        except Exception as e:
+            print(f"Background token refresh failed: {e}")
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+
+class RequestScheduler(object):
+    """
+    Gate for every Spotify request. A token bucket caps the request rate,
+    a 429 pauses all workers until its Retry-After has passed, and the
+    number of requests in flight halves on each 429 and grows back by one
+    after ramp_after successes.
+    """
+
+    def __init__(
+        self,
+        rate: float = RATE_LIMIT,
+        burst: int = RATE_BURST,
+        max_concurrency: int = MAX_WORKERS,
+        ramp_after: int = RAMP_AFTER,
+    ):
+        self.rate: float = rate
+        self.burst: int = burst
+        self.tokens: float = burst
+        self.updated: float = time.monotonic()
+        self.max_concurrency: int = max(max_concurrency, 1)
+        self.concurrency: int = self.max_concurrency
+        self.ramp_after: int = ramp_after
+        self.successes: int = 0
+        self.in_flight: int = 0
+        self.throttled_until: float = 0.0
+        self.stats: Counter = Counter()
+        self._cond = threading.Condition()
+
+    def acquire(self) -> None:
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.burst, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                wait = self.throttled_until - now
+                if wait <= 0 and self.in_flight < self.concurrency:
+                    if self.tokens >= 1:
+                        break
+                    wait = (1 - self.tokens) / self.rate
+                self._cond.wait(wait if wait > 0 else None)
+
+            self.tokens -= 1
+            self.in_flight += 1
+            self.stats["requests"] += 1
+            self.stats["throttled_secs"] += time.monotonic() - start
+
+    def release(self, r: Union[None, requests.Response]) -> None:
+        """
+        Record a finished request, r is None when it raised
+        """
+        with self._cond:
+            self.in_flight -= 1
+            if r is not None and r.status_code == 429:
+                try:
+                    retry_after = float(r.headers.get("Retry-After", 1))
+                except ValueError:
+                    retry_after = 1.0
+                print(f"Rate limited, retrying after {retry_after} secs...")
+                self.stats["rate_limited"] += 1
+                self.throttled_until = max(
+                    self.throttled_until, time.monotonic() + retry_after
+                )
+                self.concurrency = max(1, self.concurrency // 2)
+                self.successes = 0
+            elif r is not None:
+                self.successes += 1
+                if (
+                    self.successes >= self.ramp_after
+                    and self.concurrency < self.max_concurrency
+                ):
+                    self.concurrency += 1
+                    self.successes = 0
+            self._cond.notify_all()
+
+    def report(self) -> str:
+        return (
+            f"Requests: {self.stats['requests']}, "
+            f"{self.stats['rate_limited']} rate limited, "
+            f"{self.stats['throttled_secs']:.1f}s throttled, "
+            f"concurrency {self.concurrency}/{self.max_concurrency}"
+        )
+
+
+class CheckedPlaylists(object):
+    """
+    Ids of the playlists already searched by one client, so a playlist listed
+    under several categories is only fetched once. Kept in memory only: a
+    playlist claimed while searching for one artist must still be searched
+    for the next.
+    """
+
+    def __init__(self):
+        self.ids: Set[str] = set()
+        self.stats: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def __contains__(self, playlist_id: str) -> bool:
+        return playlist_id in self.ids
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def claim(self, playlist_id: str) -> bool:
+        """
+        Mark a playlist as searched
+
+        :return: False when it already was, counting the fetch saved
+        """
+        with self._lock:
+            if playlist_id in self.ids:
+                self.stats["skipped"] += 1
+                return False
+            self.ids.add(playlist_id)
+            self.stats["claimed"] += 1
+            return True
+
+    def release(self, playlist_ids: Iterable[str]) -> None:
+        """
+        Unmark playlists whose search failed, so a retry fetches them again
+        """
+        with self._lock:
+            for playlist_id in playlist_ids:
+                if playlist_id in self.ids:
+                    self.ids.discard(playlist_id)
+                    self.stats["claimed"] -= 1
+
+    def report(self) -> str:
+        return (
+            f"Checked playlists: {self.stats['claimed']} searched, "
+            f"{self.stats['skipped']} fetches saved"
+        )
 
 
 class SpotifyAPI(object):
@@ -17,6 +487,15 @@ class SpotifyAPI(object):
         client_secret,
         artist_name,
         *args,
+        requests_session=True,
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        max_workers=MAX_WORKERS,
+        max_retries=MAX_RETRIES,
+        max_depth=None,
+        cache=None,
+        token_store=None,
+        checked=None,
         **kwargs,
     ):
         super().__init__(*args, **kwargs)
@@ -24,10 +503,27 @@ class SpotifyAPI(object):
         self.client_secret: str = client_secret
         self.access_token: str = None
         self.access_token_expires: datetime = datetime.now()
-        self.access_token_did_expire: bool = True
+        self.token_manager = TokenManager(self.request_token, client_id, token_store)
         self.token_url: str = "https://accounts.spotify.com/api/token"
+        self.api_root: str = "https://api.spotify.com/v1"
+        if isinstance(requests_session, requests.Session):
+            self._session = requests_session
+        elif requests_session:
+            self._session = build_session(pool_connections, pool_maxsize)
+        else:
+            self._session = requests.api
+        self.max_workers: int = max_workers
+        self.max_retries: int = max_retries
+        self.max_depth: Union[None, int] = max_depth
+        self.cache: Union[None, PlaylistCache] = cache
+        self.cache_stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self.scheduler = RequestScheduler(max_concurrency=max_workers)
         self.playlists: List[str] = []
-        self.checked_playlists: List[str] = []
+        self.playlist_categories: Dict[str, set] = {}
+        self.checked_playlists: CheckedPlaylists = (
+            checked if checked is not None else CheckedPlaylists()
+        )
         self.artist_name: str = artist_name
 
     def get_client_credentials(self) -> str:
@@ -46,120 +542,294 @@ class SpotifyAPI(object):
     def get_token_data(self) -> Dict[str, str]:
         return {"grant_type": "client_credentials"}
 
-    def perform_auth(self) -> bool:
+    def request_token(self) -> dict:
         token_url = self.token_url
         token_data = self.get_token_data()
         token_headers = self.get_token_headers()
-        r = requests.post(token_url, data=token_data, headers=token_headers)
+        r = self._session.post(token_url, data=token_data, headers=token_headers)
         if r.status_code not in range(200, 299):
             raise Exception("Could not authenticate client.")
         data = r.json()
-        now = datetime.now()
-        access_token = data["access_token"]
-        expires_in = data["expires_in"]
-        expires = now + timedelta(seconds=expires_in)
-        self.access_token = access_token
-        self.access_token_expires = expires
-        self.access_token_did_expire = expires < now
+        return {
+            "access_token": data["access_token"],
+            "expires_at": time.time() + data["expires_in"],
+        }
+
+    def set_token(self, token: dict) -> None:
+        self.access_token = token["access_token"]
+        self.access_token_expires = datetime.fromtimestamp(token["expires_at"])
+
+    @property
+    def access_token_did_expire(self) -> bool:
+        return self.access_token_expires <= datetime.now()
+
+    def perform_auth(self) -> bool:
+        self.set_token(self.token_manager.refresh())
         return True
 
     def get_access_token(self) -> str:
-        token = self.access_token
-        expired = self.access_token_did_expire
-        if token is None or expired:
-            self.perform_auth()
-            return self.get_access_token()
-        return token
+        self.set_token(self.token_manager.get())
+        return self.access_token
+
+    def map_concurrent(self, fn: Callable, items: List) -> List:
+        """
+        Call fn on every item over max_workers threads, keeping the item order
+        """
+        if self.max_workers <= 1 or len(items) <= 1:
+            return [fn(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(fn, items))
 
     def get_playlists_from_category(self, category, country) -> Union[None, list]:
+        """
+        List a category's playlists, fetching every page after the first at once
+        from its total and limit. Playlists already listed under another category
+        in this run are only recorded in playlist_categories, so self.playlists
+        holds just the new ones.
+        """
         try:
-            access_token = self.get_access_token()
-            headers = {"Authorization": f"Bearer {access_token}"}
-            endpoint = f"https://api.spotify.com/v1/browse/categories/{category}/playlists?country={country}&offset=0&limit=50"
-            playlist_ids_and_names = []
-            while True:
-                try:
-                    r = requests.get(endpoint, headers=headers)
-                    resp = r.json()
-
-                    playlists = resp["playlists"]["items"]
-                    for i in range(len(playlists)):
-                        try:
-                            playlist_ids_and_names.append(
-                                {"id": playlists[i]["id"], "name": playlists[i]["name"]}
-                            )
-                        except TypeError:
-                            pass
-
-                    items_left = int(resp["playlists"]["total"]) - int(
-                        resp["playlists"]["limit"]
-                    )
-                    if items_left > 0:
-                        endpoint = resp["playlists"]["next"]
-                    else:
-                        break
-                except requests.exceptions.MissingSchema:
+            endpoint = f"{self.api_root}/browse/categories/{category}/playlists"
+            params = {"country": country, "offset": 0, "limit": CATEGORY_PAGE_SIZE}
+            first = self.get_json(endpoint, {}, params)["playlists"]
+            limit = int(first["limit"]) or CATEGORY_PAGE_SIZE
+            offsets = list(range(limit, int(first["total"]), limit))
+            pages = [first] + self.map_concurrent(
+                lambda offset: self.get_json(
+                    endpoint, {}, dict(params, offset=offset, limit=limit)
+                )["playlists"],
+                offsets,
+            )
 
-                    break
+            playlist_ids_and_names = []
+            for page in pages:
+                for pl in page["items"]:
+                    try:
+                        pl = project(pl, PLAYLIST_PROJECTION)
+                    except TypeError:
+                        continue
+                    if pl["id"] not in self.playlist_categories:
+                        self.playlist_categories[pl["id"]] = set()
+                        playlist_ids_and_names.append(pl)
+                    self.playlist_categories[pl["id"]].add(category)
             self.playlists = playlist_ids_and_names
+            return playlist_ids_and_names
         except ConnectionError as e:
             print(e)
             time.sleep(30)
             return self.get_playlists_from_category(category, "US")
 
-    def find_artist_in_playlists(self, artist_name: str) -> List[str]:
-        while True:
-            res = []
+    def get_response(
+        self, endpoint: str, headers: Dict[str, str], params: Dict[str, str] = None
+    ) -> requests.Response:
+        for _ in range(self.max_retries + 1):
+            request_headers = dict(
+                headers, Authorization=f"Bearer {self.get_access_token()}"
+            )
+            self.scheduler.acquire()
+            r = None
             try:
-                if not self.playlists:
-                    email_error(self.artist_name)
-                    raise Exception("There are no playlists to search!")
+                r = self._session.get(endpoint, headers=request_headers, params=params)
+            finally:
+                self.scheduler.release(r)
+            if r.status_code != 429:
+                break
+        if r.status_code != 304:
+            r.raise_for_status()
+        return r
 
-                access_token = self.get_access_token()
-                headers = {"Authorization": f"Bearer {access_token}"}
+    def get_json(
+        self, endpoint: str, headers: Dict[str, str], params: Dict[str, str] = None
+    ) -> dict:
+        return self.get_response(endpoint, headers, params).json()
 
-                def check_artists(artists: List[Dict[str, str]]) -> bool:
+    def iter_playlist_tracks(
+        self, pl: Dict[str, str], headers: Dict[str, str], first: dict = None
+    ) -> Iterator[Tuple[int, dict]]:
+        """
+        Stream the tracks of a playlist page by page, following next links
+        :param pl: playlist as an {"id", "name"} dict
+        :param headers: extra request headers, the bearer token is added per request
+        :param first: first page when the caller already fetched it
+        :return: generator of (playlist total, track item), stopping at max_depth
+        """
+        endpoint = f"{self.api_root}/playlists/{pl['id']}/tracks"
+        params = {"fields": TRACK_FIELDS, "limit": TRACK_PAGE_SIZE}
+        depth = 0
+        resp = first
+        while endpoint:
+            if resp is None:
+                resp = self.get_json(endpoint, headers, params)
+            items = resp.get("items", [])
+            total = resp.get("total", len(items))
+            for item in items:
+                if self.max_depth is not None and depth >= self.max_depth:
+                    return
+                depth += 1
+                yield total, item
 
-                    for artist in artists:
-                        if artist["name"].lower() == artist_name.lower():
+            endpoint = resp.get("next")
+            if endpoint and "fields=" in endpoint:
+                params = None
+            resp = None
 
-                            return True
-                    return False
+    def count(self, key: str) -> None:
+        with self._stats_lock:
+            self.cache_stats[key] += 1
 
-                for idx, pl in enumerate(self.playlists):
-                    if pl["name"] in self.checked_playlists:
-                        continue
+    def cache_report(self) -> str:
+        hits = self.cache_stats["snapshot_hits"] + self.cache_stats["etag_hits"]
+        total = hits + self.cache_stats["misses"]
+        rate = hits / total if total else 0.0
+        return (
+            f"Playlist cache: {self.cache_stats['snapshot_hits']} snapshot hits, "
+            f"{self.cache_stats['etag_hits']} etag hits, "
+            f"{self.cache_stats['misses']} misses ({rate:.0%} hit rate)"
+        )
+
+    def usable(self, entry: Union[None, dict]) -> Union[None, dict]:
+        """
+        :return: entry if it holds every track, or at least max_depth of them
+        """
+        if entry is None:
+            return None
+        if entry["complete"]:
+            return entry
+        if self.max_depth is not None and len(entry["items"]) >= self.max_depth:
+            return entry
+        return None
+
+    def playlist_tracks(
+        self, pl: Dict[str, str], headers: Dict[str, str]
+    ) -> Iterator[Tuple[int, dict]]:
+        """
+        Stream a playlist's tracks from the cache when its snapshot is stored,
+        otherwise from the API, storing what was read and its ETag once the
+        stream ends. A stale record stored without a snapshot_id is
+        revalidated with If-None-Match instead.
+        """
+        if self.cache is None:
+            yield from self.iter_playlist_tracks(pl, headers)
+            return
+
+        snapshot_id = pl.get("snapshot_id") or None
+        entry = self.usable(self.cache.get(pl["id"], snapshot_id))
+        if entry is not None:
+            self.count("snapshot_hits")
+            for item in entry["items"][: self.max_depth]:
+                yield entry["total"], item
+            return
 
-                    self.checked_playlists.append(pl["name"])
-                    endpoint = f"https://api.spotify.com/v1/playlists/{pl['id']}/tracks"
-                    r = requests.get(endpoint, headers=headers)
-                    r.raise_for_status()
-                    resp = r.json()
-
-                    for i, track in enumerate(resp.get("items", [])):
-                        try:
-                            if check_artists(track["track"]["album"]["artists"]):
-                                tr = track["track"]["name"]
-                                added = track["added_at"]
-                                datetime_obj = datetime.fromisoformat(added[:-1])
-                                formatted_date = datetime_obj.strftime("%m/%d/%y")
-                                print(
-                                    "found in playlist",
-                                    self.playlists[idx]["name"],
-                                )
-                                res.append(
-                                    (
-                                        tr,
-                                        self.playlists[idx]["name"],
-                                        f"{i + 1}/{len(resp['items'])} ({formatted_date})",
-                                    )
-                                )
-                        except (TypeError, KeyError):
-                            pass
-
-                return res
+        record = None
+        if snapshot_id is None:
+            record = self.cache.load(pl["id"])
+            if record is not None and (
+                record["snapshot_id"] is not None
+                or not record.get("etag")
+                or self.usable(record["entry"]) is None
+            ):
+                record = None
+
+        request_headers = headers
+        if record is not None:
+            request_headers = dict(headers, **{"If-None-Match": record["etag"]})
+        r = self.get_response(
+            f"{self.api_root}/playlists/{pl['id']}/tracks",
+            request_headers,
+            {"fields": TRACK_FIELDS, "limit": TRACK_PAGE_SIZE},
+        )
+        if r.status_code == 304:
+            # left stale so the next run revalidates it, no re-upload
+            self.count("etag_hits")
+            entry = record["entry"]
+            for item in entry["items"][: self.max_depth]:
+                yield entry["total"], item
+            return
+
+        self.count("misses")
+        total, items = 0, []
+        for total, item in self.iter_playlist_tracks(pl, headers, r.json()):
+            items.append(item)
+            yield total, item
+        entry = {"total": total, "items": items, "complete": len(items) >= total}
+        self.cache.put(pl["id"], snapshot_id, entry, r.headers.get("ETag"))
+
+    def search_playlist(
+        self,
+        pl: Dict[str, str],
+        headers: Dict[str, str],
+        match: Callable[[Dict[str, str], List[str]], List[str]],
+    ) -> List[Tuple[str, Tuple[str, str, str]]]:
+        res = []
+        for i, (total, track) in enumerate(self.playlist_tracks(pl, headers)):
+            if not track.get("track"):
+                # unavailable tracks come back as "track": null
+                continue
+            try:
+                credits = [a["name"] for a in track["track"].get("artists") or []]
+                credits += [a["name"] for a in track["track"]["album"]["artists"]]
+                for artist in match(pl, credits):
+                    tr = track["track"]["name"]
+                    added = track["added_at"]
+                    datetime_obj = datetime.fromisoformat(added[:-1])
+                    formatted_date = datetime_obj.strftime("%m/%d/%y")
+                    print(
+                        "found in playlist",
+                        pl["name"],
+                    )
+                    res.append(
+                        (
+                            artist,
+                            (
+                                tr,
+                                pl["name"],
+                                f"{i + 1}/{total} ({formatted_date})",
+                            ),
+                        )
+                    )
+            except (TypeError, KeyError):
+                pass
+        return res
+
+    def search_playlists(
+        self,
+        playlists: List[Dict[str, str]],
+        headers: Dict[str, str],
+        match: Callable[[Dict[str, str], List[str]], List[str]],
+    ) -> List[Tuple[str, Tuple[str, str, str]]]:
+        """
+        Search every playlist, fanning out over max_workers threads
+        :param playlists: playlists to search, as {"id", "name"} dicts
+        :param headers: extra request headers, the bearer token is added per request
+        :param match: returns the roster artists among a track's and its album's credits
+        :return: (artist, match) pairs in the same order as playlists
+        """
+
+        found = self.map_concurrent(
+            lambda pl: self.search_playlist(pl, headers, match), playlists
+        )
+        return [match for matches in found for match in matches]
+
+    def find_roster_in_playlists(
+        self, match: Callable[[Dict[str, str], List[str]], List[str]]
+    ) -> List[Tuple[str, Tuple[str, str, str]]]:
+        while True:
+            pending = []
+            try:
+                if not self.playlists and not self.playlist_categories:
+                    email_error(self.artist_name)
+                    raise Exception("There are no playlists to search!")
+
+                headers: Dict[str, str] = {}
+
+                for pl in self.playlists:
+                    if self.checked_playlists.claim(pl["id"]):
+                        pending.append(pl)
+
+                return self.search_playlists(pending, headers, match)
 
             except (ConnectionError, ConnectionResetError) as e:
+                # the batch's results are lost with it, so search all of it again
+                self.checked_playlists.release(pl["id"] for pl in pending)
                 print(f"Connection error occurred: {e}. Retrying in 30 seconds...")
                 time.sleep(30)
 
@@ -168,6 +838,56 @@ class SpotifyAPI(object):
                 print(f"An unexpected error occurred: {e}")
                 raise
 
+    def find_artist_in_playlists(self, artist_name: str) -> List[str]:
+        matcher = ArtistMatcher([artist_name])
+        found = self.find_roster_in_playlists(
+            lambda pl, credits: matcher.match(credits)
+        )
+        return [res for _, res in found]
+
+
+def normalize_artist(name: str) -> str:
+    """
+    Casefold, strip accents and collapse whitespace, so "BEYONCÉ" == "beyonce"
+    """
+    if name.isascii():
+        return " ".join(name.casefold().split())
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+class ArtistMatcher(object):
+    """
+    Normalized artist name -> roster artists, built once per run. A credit such
+    as "A feat. B & C" matches on the whole string or any of its artists, and
+    each distinct credit string is only normalized and split once.
+    """
+
+    def __init__(self, artists: List[str]):
+        self.names: Dict[str, List[str]] = {}
+        for artist in artists:
+            self.names.setdefault(normalize_artist(artist), []).append(artist)
+        self._credits: Dict[str, Tuple[str, ...]] = {}
+
+    def match_credit(self, credit: str) -> Tuple[str, ...]:
+        found = self._credits.get(credit)
+        if found is None:
+            name = normalize_artist(credit)
+            parts = [name] + CREDIT_SEPARATORS.split(name)
+            found = tuple(
+                dict.fromkeys(a for part in parts for a in self.names.get(part, ()))
+            )
+            self._credits[credit] = found
+        return found
+
+    def match(self, credits: Iterable[str]) -> List[str]:
+        found: Dict[str, None] = {}
+        for credit in credits:
+            for artist in self.match_credit(credit):
+                found[artist] = None
+        return list(found)
+
 
 client_id = os.getenv("SPOTIFY_CLIENT_ID")
 user_id = os.getenv("SPOTIFY_USER_ID")
@@ -195,7 +915,7 @@ class StoreTurn:
     def __init__(self, artist):
         self.artist: ArtistEvent = artist
         self.spotify_client = SpotifyAPI(
-            client_id, client_secret, self.artist["artist"]
+            client_id, client_secret, self.artist["artist"], cache=cache_from_env()
         )
 
     def find_artist(self) -> Playlist:
@@ -224,6 +944,69 @@ class StoreTurn:
                 print(f"Error finding artist in playlists: {e}")
                 continue
 
+        if self.spotify_client.cache is not None:
+            print(self.spotify_client.cache_report())
+        print(self.spotify_client.checked_playlists.report())
+        print(self.spotify_client.scheduler.report())
+        return playlist
+
+
+class RosterStoreTurn:
+    """
+    Scan the union of the roster's genre categories once, matching every track
+    against all artists and grouping the results per artist
+    """
+
+    def __init__(self, artists):
+        self.artists: List[ArtistEvent] = artists
+        self.spotify_client = SpotifyAPI(
+            client_id,
+            client_secret,
+            ", ".join(a["artist"] for a in artists),
+            cache=cache_from_env(),
+        )
+
+    def get_playlists(self) -> Dict[str, set]:
+        playlists: List[Dict[str, str]] = []
+        genres = dict.fromkeys(g for a in self.artists for g in a["genres"]["s"])
+
+        for genre in genres:
+            print(f"Getting playlists from {genre}")
+            playlists += self.spotify_client.get_playlists_from_category(genre, "US")
+
+        self.spotify_client.playlists = playlists
+        return self.spotify_client.playlist_categories
+
+    def find_artists(self) -> Playlist:
+        playlist: Playlist = {a["artist"]: [] for a in self.artists}
+        genres = {a["artist"]: set(a["genres"]["s"]) for a in self.artists}
+        matcher = ArtistMatcher(list(playlist))
+        categories = self.get_playlists()
+
+        def match(pl: Dict[str, str], credits: List[str]) -> List[str]:
+            return [
+                a for a in matcher.match(credits) if genres[a] & categories[pl["id"]]
+            ]
+
+        print(f"Searching playlists for {len(playlist)} artists")
+        try:
+            found = self.spotify_client.find_roster_in_playlists(match)
+        except Exception as e:
+            print(f"Error finding artists in playlists: {e}")
+            return playlist
+
+        for artist, r in found:
+            playlist[artist].append(
+                {
+                    "track": r[0],
+                    "playlist": r[1],
+                    "position": r[2],
+                }
+            )
+        if self.spotify_client.cache is not None:
+            print(self.spotify_client.cache_report())
+        print(self.spotify_client.checked_playlists.report())
+        print(self.spotify_client.scheduler.report())
         return playlist
 
 
@@ -271,39 +1054,51 @@ def send_email_aws(subject: str, body: str) -> None:
         print(f"Email sent! Message ID: {response['MessageId']}")
 
 
-def lambda_handler(event: ArtistEvent, context) -> Dict[str, Union[int, str]]:
-    artist_name = event["artist"]
-    body = ""
-
-    print(f"Starting search for {artist_name}")
-    store_turn_artist = StoreTurn(event)
-    playlists: Playlist = store_turn_artist.find_artist()
-    artist_playlists = playlists.get(artist_name, [])
-
-    if len(artist_playlists) == 0:
+def email_results(artist_name: str, tracks: List[Dict[str, str]]) -> bool:
+    if len(tracks) == 0:
         subject = (
             f"Spotify Store Turn: {artist_name} - {datetime.now().strftime('%m/%d/%y')}"
         )
         body = f"No tracks found for {artist_name}"
         print(body)
         send_email_aws(subject, body)
-        return {"statusCode": 200, "body": "No tracks found"}
-
-    for a, tracks in playlists.items():
-        body += f"\n{a}\n"
-        body += f"\nSpotify\n"
-        for track_info in tracks:
-            track = track_info["track"]
-            playlist_name = track_info["playlist"]
-            position = track_info["position"]
-            body += f" - {track}: {playlist_name} | {position}\n"
+        return False
 
-    print("Finished")
+    body = f"\n{artist_name}\n"
+    body += f"\nSpotify\n"
+    for track_info in tracks:
+        track = track_info["track"]
+        playlist_name = track_info["playlist"]
+        position = track_info["position"]
+        body += f" - {track}: {playlist_name} | {position}\n"
 
     subject = (
         f"Spotify Store Turn: {artist_name} - {datetime.now().strftime('%m/%d/%y')}"
     )
     print(body)
     send_email_aws(subject, body)
+    return True
+
+
+def lambda_handler(event: ArtistEvent, context) -> Dict[str, Union[int, str]]:
+    if "tracks" in event:
+        artists: List[ArtistEvent] = event["tracks"]
+        print(f"Starting search for {', '.join(a['artist'] for a in artists)}")
+        playlists: Playlist = RosterStoreTurn(artists).find_artists()
+        for artist_name, tracks in playlists.items():
+            email_results(artist_name, tracks)
+        print("Finished")
+        return {"statusCode": 200, "body": "Execution completed successfully"}
+
+    artist_name = event["artist"]
+
+    print(f"Starting search for {artist_name}")
+    store_turn_artist = StoreTurn(event)
+    playlists: Playlist = store_turn_artist.find_artist()
+    artist_playlists = playlists.get(artist_name, [])
+
+    print("Finished")
+    if not email_results(artist_name, artist_playlists):
+        return {"statusCode": 200, "body": "No tracks found"}
 
     return {"statusCode": 200, "body": "Execution completed successfully"}
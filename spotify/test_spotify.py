@@ -1,9 +1,27 @@
+import io
+import os
+import time
 import pytest
+import requests
+from botocore.exceptions import ClientError
+from requests.adapters import HTTPAdapter
 from unittest.mock import patch, MagicMock
 from datetime import datetime
 from spotify.package.main import SpotifyAPI
+from spotify.package.main import build_session
+from spotify.package.main import TRACK_FIELDS
+from spotify.package.main import build_fields
+from spotify.package.main import project
+from spotify.package.main import DiskPlaylistCache
+from spotify.package.main import S3PlaylistCache
 from spotify.package.main import StoreTurn
 from spotify.package.main import lambda_handler
+from spotify.package.main import ArtistMatcher
+from spotify.package.main import RosterStoreTurn
+from spotify.package.main import MemoryTokenStore
+from spotify.package.main import TokenManager
+from spotify.package.main import RequestScheduler
+from spotify.package.main import CheckedPlaylists
 
 
 @pytest.fixture
@@ -12,7 +30,9 @@ def spotify_api():
     client_id = "test_client_id"
     client_secret = "test_client_secret"
     artist_name = "test_artist"
-    return SpotifyAPI(client_id, client_secret, artist_name)
+    return SpotifyAPI(
+        client_id, client_secret, artist_name, token_store=MemoryTokenStore()
+    )
 
 
 def test_get_client_credentials(spotify_api):
@@ -22,7 +42,7 @@ def test_get_client_credentials(spotify_api):
     assert len(encoded_creds) > 0
 
 
-@patch("requests.post")
+@patch("requests.Session.post")
 def test_perform_auth(mock_post, spotify_api):
     """Test successful authentication"""
     mock_response = MagicMock()
@@ -38,35 +58,41 @@ def test_perform_auth(mock_post, spotify_api):
     assert spotify_api.access_token_expires > datetime.now()
 
 
-@patch.object(SpotifyAPI, "perform_auth")
-def test_get_access_token_expired(mock_perform_auth, spotify_api):
+def test_get_access_token_expired(spotify_api):
     """Test case where the access token has expired"""
-    spotify_api.access_token = "expired_token"
-    spotify_api.access_token_did_expire = True
-
-    def set_valid_token():
-        spotify_api.access_token = "new_valid_token"
-        spotify_api.access_token_did_expire = False
+    spotify_api.token_manager.token = {
+        "access_token": "expired_token",
+        "expires_at": time.time() - 1,
+    }
+    mock_request_token = MagicMock(
+        return_value={
+            "access_token": "new_valid_token",
+            "expires_at": time.time() + 3600,
+        }
+    )
+    spotify_api.token_manager.fetch = mock_request_token
 
-    mock_perform_auth.side_effect = set_valid_token
     token = spotify_api.get_access_token()
-    mock_perform_auth.assert_called_once()
+    mock_request_token.assert_called_once()
     assert token == "new_valid_token"
+    assert not spotify_api.access_token_did_expire
 
 
-@patch.object(SpotifyAPI, "get_access_token")
-def test_get_access_token_valid(mock_get_access_token, spotify_api):
-    spotify_api.access_token = "valid_token"
-    spotify_api.access_token_did_expire = False
-    mock_get_access_token.return_value = spotify_api.access_token
+def test_get_access_token_valid(spotify_api):
+    spotify_api.token_manager.token = {
+        "access_token": "valid_token",
+        "expires_at": time.time() + 3600,
+    }
+    mock_request_token = MagicMock()
+    spotify_api.token_manager.fetch = mock_request_token
 
-    token = mock_get_access_token()
+    token = spotify_api.get_access_token()
 
     assert token == "valid_token"
-    assert mock_get_access_token() == token
+    mock_request_token.assert_not_called()
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
 @patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
 def test_get_playlists_from_category(mock_get_access_token, mock_get, spotify_api):
     """Test playlist retrieval from category"""
@@ -89,7 +115,31 @@ def test_get_playlists_from_category(mock_get_access_token, mock_get, spotify_ap
     mock_get_access_token.assert_called_once()
 
 
-@patch("requests.get")
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_get_playlists_from_category_retries_429(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """Category listing goes through the scheduler, so a 429 is waited out"""
+    limited = MagicMock(status_code=429, headers={"Retry-After": "0.1"})
+    listed = MagicMock(status_code=200)
+    listed.json.return_value = {
+        "playlists": {
+            "items": [{"id": "1", "name": "Test Playlist"}],
+            "total": 1,
+            "limit": 1,
+        }
+    }
+    mock_get.side_effect = [limited, listed]
+
+    playlists = spotify_api.get_playlists_from_category("test_category", "US")
+
+    assert [pl["id"] for pl in playlists] == ["1"]
+    assert mock_get.call_count == 2
+    assert spotify_api.scheduler.stats["rate_limited"] == 1
+
+
+@patch("requests.Session.get")
 @patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
 def test_find_artist_in_playlist(mock_get_access_token, mock_get, spotify_api):
     mock_response = MagicMock()
@@ -120,12 +170,13 @@ def test_find_artist_in_playlist(mock_get_access_token, mock_get, spotify_api):
     mock_get.assert_called_once_with(
         "https://api.spotify.com/v1/playlists/test_playlist_id/tracks",
         headers={"Authorization": "Bearer valid_token"},
+        params={"fields": TRACK_FIELDS, "limit": 100},
     )
     mock_get_access_token.assert_called_once()
 
 
 @patch("spotify.package.main.email_error")
-def test_find_artist_in_playlist(mock_email_error, spotify_api):
+def test_find_artist_in_playlist_no_playlists(mock_email_error, spotify_api):
 
     spotify_api.playlists = []
     with pytest.raises(Exception) as exc_info:
@@ -134,6 +185,61 @@ def test_find_artist_in_playlist(mock_email_error, spotify_api):
     assert str(exc_info.value) == "There are no playlists to search!"
 
 
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_checks_by_id(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """Playlists sharing a name are both searched, repeated ids only once"""
+    mock_get.side_effect = lambda endpoint, **kwargs: make_page(["test_artist"], 1)
+    spotify_api.playlists = [
+        {"id": "1", "name": "Shared"},
+        {"id": "2", "name": "Shared"},
+        {"id": "1", "name": "Shared"},
+    ]
+
+    result = spotify_api.find_artist_in_playlists("test_artist")
+
+    assert len(result) == 2
+    assert mock_get.call_count == 2
+    assert spotify_api.checked_playlists.stats == {"claimed": 2, "skipped": 1}
+
+
+@patch("spotify.package.main.time.sleep")
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_retries_released_playlists(
+    mock_get_access_token, mock_get, mock_sleep, spotify_api
+):
+    """A connection error releases the batch's claims, so the retry searches it"""
+    mock_get.side_effect = [
+        make_page(["test_artist"], 1),
+        ConnectionResetError("reset"),
+        make_page(["test_artist"], 1),
+        make_page(["test_artist"], 1),
+    ]
+    spotify_api.playlists = [{"id": "1", "name": "one"}, {"id": "2", "name": "two"}]
+
+    result = spotify_api.find_artist_in_playlists("test_artist")
+
+    assert [r[1] for r in result] == ["one", "two"]
+    assert mock_get.call_count == 4
+    mock_sleep.assert_called_once_with(30)
+    assert spotify_api.checked_playlists.stats == {"claimed": 2}
+
+
+def test_checked_playlists_injected_when_empty():
+    """An empty CheckedPlaylists is falsy but is still the one the client uses"""
+    checked = CheckedPlaylists()
+    api = SpotifyAPI("id", "secret", "artist", checked=checked)
+    assert api.checked_playlists is checked
+
+    assert checked.claim("1")
+    assert not checked.claim("1")
+    assert "1" in checked and len(checked) == 1
+    assert checked.report() == "Checked playlists: 1 searched, 1 fetches saved"
+
+
 @pytest.fixture
 def store_turn():
     artist = {
@@ -226,3 +332,583 @@ def test_lambda_handler_not_found(
     assert result["body"] == "No tracks found"
     mock_find_artist.assert_called_once()
     mock_send_email_aws.assert_called_once()
+
+
+def test_build_session_pool_sizes():
+    session = build_session(pool_connections=2, pool_maxsize=8)
+    adapter = session.get_adapter("https://api.spotify.com/v1")
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 8
+
+
+def test_session_reused_for_auth_and_catalog(spotify_api):
+    """Auth and catalog calls go through the same pooled session"""
+    session = MagicMock()
+    session.post.return_value.status_code = 200
+    session.post.return_value.json.return_value = {
+        "access_token": "test_access_token",
+        "expires_in": 3600,
+    }
+    session.get.return_value.json.return_value = {
+        "playlists": {"items": [], "total": 0, "limit": 50, "next": None}
+    }
+    spotify_api._session = session
+
+    spotify_api.get_playlists_from_category("test_category", "US")
+    session.post.assert_called_once()
+    session.get.assert_called_once()
+
+
+def test_requests_session_disabled():
+    api = SpotifyAPI(
+        "test_client_id", "test_client_secret", "test_artist", requests_session=False
+    )
+    assert api._session is requests.api
+
+
+def make_tracks_response(artist, status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    response.json.return_value = {
+        "items": [
+            {
+                "track": {
+                    "name": f"{artist}_track",
+                    "album": {"artists": [{"name": artist}]},
+                },
+                "added_at": "2024-09-06T04:00:00Z",
+            }
+        ]
+    }
+    return response
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_concurrent_order(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """Concurrent fetches keep the playlist order of the results"""
+    spotify_api.max_workers = 4
+    spotify_api.playlists = [
+        {"id": f"id{i}", "name": f"playlist{i}"} for i in range(10)
+    ]
+    mock_get.side_effect = lambda endpoint, **kwargs: make_tracks_response(
+        "test_artist"
+    )
+
+    result = spotify_api.find_artist_in_playlists("test_artist")
+
+    assert [r[1] for r in result] == [f"playlist{i}" for i in range(10)]
+    assert mock_get.call_count == 10
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_get_json_retry_after(mock_get_access_token, mock_get, spotify_api):
+    """A 429 pauses the fetch for Retry-After seconds before retrying"""
+    mock_get.side_effect = [
+        make_tracks_response("test_artist", 429, {"Retry-After": "0.2"}),
+        make_tracks_response("test_artist"),
+    ]
+
+    start = time.monotonic()
+    resp = spotify_api.get_json(
+        "https://api.spotify.com/v1/playlists/id/tracks",
+        {"Authorization": "Bearer valid_token"},
+    )
+
+    assert resp["items"][0]["track"]["name"] == "test_artist_track"
+    assert mock_get.call_count == 2
+    assert time.monotonic() - start >= 0.2
+    assert spotify_api.scheduler.stats["rate_limited"] == 1
+    assert spotify_api.scheduler.stats["throttled_secs"] >= 0.2
+
+
+def make_page(names, total, next_url=None, etag=None):
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {"ETag": etag} if etag else {}
+    response.json.return_value = {
+        "items": [
+            {
+                "track": {"name": name, "album": {"artists": [{"name": name}]}},
+                "added_at": "2024-09-06T04:00:00Z",
+            }
+            for name in names
+        ],
+        "next": next_url,
+        "total": total,
+    }
+    return response
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_follows_next(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """Tracks past the first page are found with their real position"""
+    next_url = (
+        "https://api.spotify.com/v1/playlists/id/tracks?offset=2&limit=2"
+        f"&fields={TRACK_FIELDS}"
+    )
+    mock_get.side_effect = [
+        make_page(["a", "b"], 3, next_url),
+        make_page(["test_artist"], 3),
+    ]
+    spotify_api.playlists = [{"id": "id", "name": "playlist"}]
+
+    result = spotify_api.find_artist_in_playlists("test_artist")
+
+    assert result == [("test_artist", "playlist", "3/3 (09/06/24)")]
+    assert mock_get.call_count == 2
+    assert mock_get.call_args == (
+        (next_url,),
+        {"headers": {"Authorization": "Bearer valid_token"}, "params": None},
+    )
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_skips_null_tracks(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """An unavailable track is skipped without losing the rest of the playlist"""
+    page = make_page(["test_artist"], 2)
+    items = page.json.return_value["items"]
+    items.insert(0, {"track": None, "added_at": "2024-09-06T04:00:00Z"})
+    mock_get.return_value = page
+    spotify_api.playlists = [{"id": "id", "name": "playlist"}]
+
+    result = spotify_api.find_artist_in_playlists("test_artist")
+
+    assert result == [("test_artist", "playlist", "2/2 (09/06/24)")]
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_iter_playlist_tracks_max_depth(mock_get_access_token, mock_get, spotify_api):
+    """Pagination stops once max_depth tracks have been read"""
+    mock_get.side_effect = [
+        make_page(["a", "b"], 6, "https://api.spotify.com/v1/next"),
+        make_page(["c", "d"], 6, "https://api.spotify.com/v1/next"),
+    ]
+    spotify_api.max_depth = 3
+
+    tracks = list(spotify_api.iter_playlist_tracks({"id": "id", "name": "pl"}, {}))
+
+    assert [t["track"]["name"] for _, t in tracks] == ["a", "b", "c"]
+    assert mock_get.call_count == 2
+
+
+def test_build_fields():
+    projection = {"items": {"track": {"name": None, "id": None}}, "next": None}
+    assert build_fields(projection) == "items(track(name,id)),next"
+
+
+def test_project_trims_nested_objects():
+    data = {
+        "items": [
+            {"track": {"name": "a", "popularity": 10}, "is_local": False},
+            {"track": {"name": "b", "popularity": 20}, "is_local": False},
+        ],
+        "href": "https://api.spotify.com/v1/playlists/id/tracks",
+    }
+    projection = {"items": {"track": {"name": None}}}
+    assert project(data, projection) == {
+        "items": [{"track": {"name": "a"}}, {"track": {"name": "b"}}]
+    }
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_get_playlists_from_category_skips_null_playlists(
+    mock_get_access_token, mock_get, spotify_api
+):
+    mock_get.return_value.json.return_value = {
+        "playlists": {
+            "items": [
+                {"id": "1", "name": "Test Playlist", "images": [], "tracks": {}},
+                None,
+            ],
+            "total": 2,
+            "limit": 50,
+            "next": None,
+        }
+    }
+
+    spotify_api.get_playlists_from_category("test_category", "US")
+    assert spotify_api.playlists == [{"id": "1", "name": "Test Playlist"}]
+
+
+def make_category_page(ids, offset, total, limit=2):
+    response = MagicMock()
+    response.status_code = 200
+    response.json.return_value = {
+        "playlists": {
+            "items": [{"id": i, "name": f"Playlist {i}"} for i in ids],
+            "offset": offset,
+            "limit": limit,
+            "total": total,
+            "next": None,
+        }
+    }
+    return response
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_get_playlists_from_category_fetches_offsets(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """Every page after the first is requested by offset from the known total"""
+    pages = {0: ["1", "2"], 2: ["3", "4"], 4: ["5"]}
+    mock_get.side_effect = lambda endpoint, **kwargs: make_category_page(
+        pages[kwargs["params"]["offset"]], kwargs["params"]["offset"], 5
+    )
+
+    playlists = spotify_api.get_playlists_from_category("test_category", "US")
+
+    offsets = sorted(c.kwargs["params"]["offset"] for c in mock_get.call_args_list)
+    assert offsets == [0, 2, 4]
+    assert [pl["id"] for pl in playlists] == ["1", "2", "3", "4", "5"]
+    assert spotify_api.playlists == playlists
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_get_playlists_from_category_dedupes_across_categories(
+    mock_get_access_token, mock_get, spotify_api
+):
+    mock_get.return_value = make_category_page(["1", "2"], 0, 2)
+    spotify_api.get_playlists_from_category("hiphop", "US")
+    mock_get.return_value = make_category_page(["2", "3"], 0, 2)
+
+    playlists = spotify_api.get_playlists_from_category("pop", "US")
+
+    assert [pl["id"] for pl in playlists] == ["3"]
+    assert spotify_api.playlist_categories == {
+        "1": {"hiphop"},
+        "2": {"hiphop", "pop"},
+        "3": {"pop"},
+    }
+    assert spotify_api.find_artist_in_playlists("artist") == []
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskPlaylistCache(str(tmp_path))
+    entry = {"total": 1, "items": [{"track": {"name": "a"}}], "complete": True}
+    cache.put("id", "snap1", entry)
+
+    assert cache.get("id", "snap1") == entry
+    assert cache.get("id", "snap2") is None
+    assert cache.get("other", "snap1") is None
+
+
+def test_disk_cache_ttl(tmp_path):
+    """Only records without a snapshot_id expire"""
+    cache = DiskPlaylistCache(str(tmp_path), ttl=60)
+    entry = {"total": 0, "items": [], "complete": True}
+    cache.put("id", "snap", entry)
+    cache.put("unversioned", None, entry)
+
+    with patch("spotify.package.main.time.time", return_value=time.time() + 61):
+        assert cache.get("id", "snap") == entry
+        assert cache.get("unversioned", None) is None
+
+
+def test_disk_cache_evicts_oldest_past_max_bytes(tmp_path):
+    cache = DiskPlaylistCache(str(tmp_path), max_bytes=300)
+    entry = {"total": 1, "items": [{"track": {"name": "x" * 100}}], "complete": True}
+    for i in range(3):
+        cache.put(f"id{i}", "snap", entry)
+        os.utime(tmp_path / f"id{i}.json", (i, i))
+    cache.put("id3", "snap", entry)
+
+    assert cache.get("id0", "snap") is None
+    assert cache.get("id3", "snap") == entry
+
+
+def test_s3_cache_round_trip():
+    objects = {}
+    client = MagicMock()
+    client.put_object.side_effect = lambda Bucket, Key, Body: objects.update(
+        {Key: Body}
+    )
+
+    def get_object(Bucket, Key):
+        if Key not in objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey"}}, "GetObject")
+        return {"Body": io.BytesIO(objects[Key])}
+
+    client.get_object.side_effect = get_object
+    cache = S3PlaylistCache("bucket", "playlists/", client=client)
+    entry = {"total": 0, "items": [], "complete": True}
+    cache.put("id", "snap", entry)
+
+    assert "playlists/id.json" in objects
+    assert cache.get("id", "snap") == entry
+    assert cache.get("missing", "snap") is None
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_uses_cache(
+    mock_get_access_token, mock_get, spotify_api, tmp_path
+):
+    """A playlist fetched for one artist is served from the cache for the next"""
+    mock_get.return_value = make_page(["test_artist", "other_artist"], 2)
+    playlists = [{"id": "id", "name": "playlist", "snapshot_id": "snap"}]
+    cache = DiskPlaylistCache(str(tmp_path))
+
+    spotify_api.cache = cache
+    spotify_api.playlists = playlists
+    first = spotify_api.find_artist_in_playlists("test_artist")
+
+    other_api = SpotifyAPI("id", "secret", "other_artist", cache=cache)
+    other_api.playlists = playlists
+    with patch.object(other_api, "get_access_token", return_value="valid_token"):
+        second = other_api.find_artist_in_playlists("other_artist")
+
+    assert first == [("test_artist", "playlist", "1/2 (09/06/24)")]
+    assert second == [("other_artist", "playlist", "2/2 (09/06/24)")]
+    mock_get.assert_called_once()
+
+
+def test_artist_matcher_match():
+    matcher = ArtistMatcher(["Steinza", "Dave Blunts"])
+    assert matcher.match(["dave blunts", "STEINZA"]) == ["Dave Blunts", "Steinza"]
+    assert matcher.match(["Someone Else"]) == []
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_find_artist_in_playlists_matches_track_artists(
+    mock_get_access_token, mock_get, spotify_api
+):
+    """A feature on someone else's album is found through the track's artists"""
+    mock_get.return_value.headers = {}
+    mock_get.return_value.json.return_value = {
+        "items": [
+            {
+                "track": {
+                    "name": "Collab",
+                    "artists": [{"name": "Headliner"}, {"name": "Tést Artist"}],
+                    "album": {"artists": [{"name": "Headliner"}]},
+                },
+                "added_at": "2024-09-06T04:00:00Z",
+            }
+        ],
+        "next": None,
+        "total": 1,
+    }
+    spotify_api.playlists = [{"id": "1", "name": "Rap"}]
+
+    result = spotify_api.find_artist_in_playlists("test artist")
+
+    assert result == [("Collab", "Rap", "1/1 (09/06/24)")]
+
+
+def test_artist_matcher_normalizes_and_splits_credits():
+    matcher = ArtistMatcher(["Beyoncé", "Dave Blunts", "Earth, Wind & Fire"])
+    assert matcher.match_credit("BEYONCE") == ("Beyoncé",)
+    assert matcher.match_credit("Someone feat. Dave  Blunts") == ("Dave Blunts",)
+    assert matcher.match_credit("Someone (ft. Beyonce)") == ("Beyoncé",)
+    assert matcher.match_credit("Dave Blunts, Someone & Beyoncé") == (
+        "Dave Blunts",
+        "Beyoncé",
+    )
+    assert matcher.match_credit("Earth, Wind & Fire") == ("Earth, Wind & Fire",)
+    assert matcher.match_credit("Dave Bluntsy") == ()
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+@patch.object(SpotifyAPI, "get_playlists_from_category", autospec=True)
+def test_roster_find_artists(mock_get_playlists, mock_get_access_token, mock_get):
+    """Shared playlists are fetched once and matches are grouped per artist"""
+    category_playlists = {
+        "hiphop": [{"id": "1", "name": "Rap"}, {"id": "2", "name": "Shared"}],
+        "pop": [{"id": "2", "name": "Shared"}, {"id": "3", "name": "Pop"}],
+    }
+
+    def get_playlists(api, category, country):
+        new = []
+        for pl in category_playlists[category]:
+            if pl["id"] not in api.playlist_categories:
+                api.playlist_categories[pl["id"]] = set()
+                new.append(pl)
+            api.playlist_categories[pl["id"]].add(category)
+        api.playlists = new
+        return new
+
+    mock_get_playlists.side_effect = get_playlists
+    mock_get.side_effect = lambda endpoint, **kwargs: make_page(
+        ["artist_a", "artist_b"], 2
+    )
+    roster = RosterStoreTurn(
+        [
+            {"artist": "artist_a", "genres": {"s": ["hiphop"]}},
+            {"artist": "artist_b", "genres": {"s": ["hiphop", "pop"]}},
+        ]
+    )
+
+    result = roster.find_artists()
+
+    assert mock_get.call_count == 3
+    assert mock_get_playlists.call_count == 2
+    assert [r["playlist"] for r in result["artist_a"]] == ["Rap", "Shared"]
+    assert [r["playlist"] for r in result["artist_b"]] == ["Rap", "Shared", "Pop"]
+    assert result["artist_b"][0]["position"] == "2/2 (09/06/24)"
+
+
+@patch("spotify.package.main.send_email_aws")
+@patch.object(RosterStoreTurn, "find_artists")
+def test_lambda_handler_roster(mock_find_artists, mock_send_email_aws):
+    event = {
+        "tracks": [
+            {"artist": "artist_a", "genres": {"s": ["test-genre"]}},
+            {"artist": "artist_b", "genres": {"s": ["test-genre"]}},
+        ]
+    }
+    mock_find_artists.return_value = {
+        "artist_a": [{"track": "t", "playlist": "p", "position": "1/1"}],
+        "artist_b": [],
+    }
+
+    result = lambda_handler(event, None)
+
+    assert result["statusCode"] == 200
+    mock_find_artists.assert_called_once()
+    assert mock_send_email_aws.call_count == 2
+    assert "No tracks found for artist_b" in mock_send_email_aws.call_args[0][1]
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_playlist_tracks_revalidates_stale_entry(
+    mock_get_access_token, mock_get, spotify_api, tmp_path
+):
+    """A stale entry stored without a snapshot_id is answered by a 304"""
+    pl = {"id": "id", "name": "playlist"}
+    spotify_api.cache = DiskPlaylistCache(str(tmp_path), ttl=0)
+    mock_get.return_value = make_page(["a", "b"], 2, etag='"v1"')
+    first = list(spotify_api.playlist_tracks(pl, {}))
+
+    not_modified = MagicMock()
+    not_modified.status_code = 304
+    mock_get.return_value = not_modified
+    with patch.object(spotify_api.cache, "store") as mock_store:
+        second = list(spotify_api.playlist_tracks(pl, {}))
+
+    assert first == second
+    assert mock_get.call_args[1]["headers"]["If-None-Match"] == '"v1"'
+    mock_store.assert_not_called()
+    assert spotify_api.cache_stats == {"misses": 1, "etag_hits": 1}
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_playlist_tracks_serves_stored_snapshot_past_ttl(
+    mock_get_access_token, mock_get, spotify_api, tmp_path
+):
+    """An unchanged snapshot_id needs no request, however old the record"""
+    pl = {"id": "id", "name": "playlist", "snapshot_id": "snap"}
+    spotify_api.cache = DiskPlaylistCache(str(tmp_path), ttl=0)
+    mock_get.return_value = make_page(["a", "b"], 2, etag='"v1"')
+    first = list(spotify_api.playlist_tracks(pl, {}))
+    second = list(spotify_api.playlist_tracks(pl, {}))
+
+    assert first == second
+    mock_get.assert_called_once()
+    assert spotify_api.cache_stats == {"misses": 1, "snapshot_hits": 1}
+
+
+@patch("requests.Session.get")
+@patch.object(SpotifyAPI, "get_access_token", return_value="valid_token")
+def test_playlist_tracks_snapshot_changed(
+    mock_get_access_token, mock_get, spotify_api, tmp_path
+):
+    """A new snapshot_id refetches without a conditional header"""
+    spotify_api.cache = DiskPlaylistCache(str(tmp_path))
+    mock_get.return_value = make_page(["a"], 1, etag='"v1"')
+    pl = {"id": "id", "name": "playlist", "snapshot_id": "snap1"}
+    list(spotify_api.playlist_tracks(pl, {}))
+    list(spotify_api.playlist_tracks(pl, {}))
+
+    mock_get.return_value = make_page(["b"], 1, etag='"v2"')
+    pl = {"id": "id", "name": "playlist", "snapshot_id": "snap2"}
+    tracks = list(spotify_api.playlist_tracks(pl, {}))
+
+    assert tracks[0][1]["track"]["name"] == "b"
+    assert "If-None-Match" not in mock_get.call_args[1]["headers"]
+    assert spotify_api.cache_stats == {"misses": 2, "snapshot_hits": 1}
+    assert "1 snapshot hits, 0 etag hits, 2 misses (33% hit rate)" in (
+        spotify_api.cache_report()
+    )
+
+
+def test_token_manager_reuses_stored_token():
+    """A warm invocation picks up the token saved by the previous one"""
+    store = MemoryTokenStore()
+    fetch = MagicMock(
+        return_value={"access_token": "token", "expires_at": time.time() + 3600}
+    )
+    TokenManager(fetch, "client", store).get()
+    token = TokenManager(fetch, "client", store).get()
+
+    assert token["access_token"] == "token"
+    fetch.assert_called_once()
+
+
+def test_token_manager_refreshes_in_background():
+    """A token close to expiry is still served while the next one is fetched"""
+    store = MemoryTokenStore()
+    store.save("client", {"access_token": "old", "expires_at": time.time() + 60})
+    fetch = MagicMock(
+        return_value={"access_token": "new", "expires_at": time.time() + 3600}
+    )
+    manager = TokenManager(fetch, "client", store, refresh_margin=300)
+
+    assert manager.get()["access_token"] == "old"
+    for _ in range(100):
+        if not manager._refreshing:
+            break
+        time.sleep(0.01)
+
+    assert manager.get()["access_token"] == "new"
+    assert store.load("client")["access_token"] == "new"
+    fetch.assert_called_once()
+
+
+def test_scheduler_token_bucket_caps_rate():
+    scheduler = RequestScheduler(rate=50, burst=1)
+    ok = MagicMock(status_code=200)
+
+    start = time.monotonic()
+    for _ in range(6):
+        scheduler.acquire()
+        scheduler.release(ok)
+
+    assert time.monotonic() - start >= 0.1
+    assert scheduler.stats["requests"] == 6
+
+
+def test_scheduler_adapts_concurrency():
+    """429s halve the requests in flight, successes ramp them back up"""
+    scheduler = RequestScheduler(max_concurrency=8, ramp_after=2)
+    limited = MagicMock(status_code=429, headers={"Retry-After": "0"})
+    ok = MagicMock(status_code=200)
+
+    scheduler.acquire()
+    scheduler.release(limited)
+    assert scheduler.concurrency == 4
+
+    for _ in range(4):
+        scheduler.acquire()
+        scheduler.release(ok)
+    assert scheduler.concurrency == 6
+    assert "1 rate limited" in scheduler.report()
@@ -14,7 +14,7 @@ resource "aws_iam_role" "store_turn_role" {
   })
 }
 
-# Policy for store-turn Lambda to send emails and create logs
+# Policy for store-turn Lambda to send emails, use the cache and create logs
 resource "aws_iam_role_policy" "store_turn_policy" {
   name = "store-turn-policy"
   role = aws_iam_role.store_turn_role.id
@@ -27,6 +27,14 @@ resource "aws_iam_role_policy" "store_turn_policy" {
         "Action" : "ses:SendEmail",
         "Resource" : "arn:aws:ses:us-east-1:742736545134:identity/*"
       },
+      {
+        "Effect" : "Allow",
+        "Action" : [
+          "s3:GetObject",
+          "s3:PutObject"
+        ],
+        "Resource" : "${aws_s3_bucket.store_turn_cache.arn}/*"
+      },
       {
         "Effect" : "Allow",
         "Action" : [
@@ -25,6 +25,7 @@ resource "aws_lambda_function" "store_turn_spotify" {
       SPOTIFY_CLIENT_ID     = var.spotify_client_id
       SPOTIFY_CLIENT_SECRET = var.spotify_client_secret
       SPOTIFY_USER_ID       = var.spotify_user_id
+      SPOTIFY_CACHE_BUCKET  = aws_s3_bucket.store_turn_cache.id
       ALEX                  = var.alex
       ARI                   = var.ari
       LAURA                 = var.laura
@@ -40,14 +41,19 @@ resource "aws_lambda_function" "store_turn_apple" {
   timeout       = 480
   memory_size   = 2048
 
+  # invoked asynchronously, so this is the cap on Chrome containers; throttled
+  # events wait in the async queue
+  reserved_concurrent_executions = var.apple_max_concurrency
+
   environment {
     variables = {
-      APPLE_TEAM_ID     = var.apple_team_id
-      APPLE_KEY_ID      = var.apple_key_id
-      APPLE_PRIVATE_KEY = var.apple_private_key
-      ALEX              = var.alex
-      ARI               = var.ari
-      LAURA             = var.laura
+      APPLE_TEAM_ID      = var.apple_team_id
+      APPLE_KEY_ID       = var.apple_key_id
+      APPLE_PRIVATE_KEY  = var.apple_private_key
+      APPLE_CHART_BUCKET = aws_s3_bucket.store_turn_cache.id
+      ALEX               = var.alex
+      ARI                = var.ari
+      LAURA              = var.laura
     }
   }
 
@@ -63,7 +69,8 @@ resource "aws_lambda_function" "store_turn_invoke" {
   timeout          = 200
   environment {
     variables = {
-      ALEX = var.alex
+      APPLE_DISPATCH_CONCURRENCY = var.apple_max_concurrency
+      ALEX                       = var.alex
     }
   }
 }
@@ -0,0 +1,19 @@
+# Cache shared by the store-turn Lambdas within a run
+resource "aws_s3_bucket" "store_turn_cache" {
+  bucket = "store-turn-cache-bucket"
+}
+
+resource "aws_s3_bucket_lifecycle_configuration" "store_turn_cache" {
+  bucket = aws_s3_bucket.store_turn_cache.id
+
+  rule {
+    id     = "expire-cache"
+    status = "Enabled"
+
+    filter {}
+
+    expiration {
+      days = 7
+    }
+  }
+}
@@ -37,6 +37,12 @@ variable "apple_private_key" {
   type = string
 }
 
+variable "apple_max_concurrency" {
+  description = "store-turn-apple instances running at once"
+  type        = number
+  default     = 2
+}
+
 variable "alex" {
   type = string
 }